@@ -1,4 +1,18 @@
+import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import BuildManifest
+from classname_index import ClassnameIndex
+from gamedata_publish import (
+    DEFAULT_KEEP_GENERATIONS,
+    MAPPING_NAME,
+    collect_generations,
+    publish_hashed,
+    rewrite_renderer_config,
+)
+from precompress import precompress_files
 
 todo_types = ["roomitemtypes", "wallitemtypes"]
 
@@ -7,66 +21,411 @@ todo_types = ["roomitemtypes", "wallitemtypes"]
 # Furnidata classname = items_base.item_name/public_name
 # items_base.id = catalog_items.items_id which is different from sprite id and furnidata id
 
-def normalize_classnames(classname):
-    return str(classname).replace("_", "").replace(" ", "")
+LOCALIZED_FURNIDATA = 'gamedata/furnidata.json'
+LOCALIZED_PRODUCTDATA = 'gamedata/productdata.json'
+# Locale under which the single-locale mode stores its names in the index
+LOCALIZED_LOCALE = 'default'
+GAMEDATA_DIR = '../assets/gamedata'
+FURNITUREDATA = os.path.join(GAMEDATA_DIR, 'FurnitureData.json')
+PRODUCTDATA = os.path.join(GAMEDATA_DIR, 'ProductData.json')
+# Outputs of the batch mode, one directory per locale
+LOCALES_DIR = os.path.join(GAMEDATA_DIR, 'locales')
+
+# Change summary of the last run, next to the translated files
+CHANGES_NAME = '.translation-changes.json'
+# Changed classnames listed per file in the summary
+CHANGES_SAMPLE_LIMIT = 100
+# Bump when the translation rules change, so fresh outputs are translated again
+TRANSLATOR_VERSION = "1"
+
+TRANSLATED_FIELDS = ("name", "description", "specialtype")
+_MISSING = object()
+
+
+def translated_record(record, translation, fields):
+    """
+    Copia de record con los campos de translation que le aplican, o None
+    si ninguno cambia; record nunca se modifica
+    """
+    translated = None
+    for field in fields:
+        value = translation.get(field, _MISSING)
+        if value is not _MISSING and record.get(field, _MISSING) != value:
+            if translated is None:
+                translated = dict(record)
+            translated[field] = value
+    return translated
+
+
+def translate_records(records, matches, key, fields):
+    """
+    Traduce una lista de registros sin modificarla: los registros que
+    cambian se copian y el resto se comparte con la lista original
+    matches son pares (posición, traducción) en orden, del ClassnameIndex
+    Retorna (registros traducidos, valores de key de los que cambiaron)
+    """
+    translated = list(records)
+    changed = []
+    for position, translation in matches:
+        new_record = translated_record(records[position], translation, fields)
+        if new_record is not None:
+            translated[position] = new_record
+            changed.append(records[position][key])
+    return translated, changed
 
-# Create a dictionary mapping classname to name and description
-furniture_dict = {}
-with open('gamedata/furnidata.json', 'r', encoding='utf-8') as f:
-    furniture_data = json.load(f)
+
+def translate_furnidata(furniture_data, index, locale):
+    """
+    Retorna (FurnitureData traducido a locale, classnames que cambiaron)
+    furniture_data no se modifica, así que puede reutilizarse
+    """
+    # Replace the name and description values with values from the XML file
+    result = dict(furniture_data)
+    changed = []
     for todo_type in todo_types:
-        for furnitype in furniture_data[todo_type]["furnitype"]:
-            classname = normalize_classnames(furnitype['classname'])
-            furniture_dict[classname] = {
-                "name": furnitype['name'],
-                "description": furnitype['description'],
-                "specialtype": furnitype['specialtype'],
-            }
-            if str(furniture_dict[classname]['description']).endswith("desc"):
-                furniture_dict[classname]['description'] = ""
-
-with open('gamedata/productdata.json', 'r', encoding='utf-8') as f:
-    product_data = json.load(f)
-    for product in product_data["productdata"]["product"]:
-        classname = normalize_classnames(product['code'])
-        furniture_dict[classname] = {
-            "name": product['name'],
-            "description": product['description'],
+        section = furniture_data[todo_type]
+        records, section_changed = translate_records(
+            section["furnitype"],
+            index.furni_translations(locale, todo_type),
+            'classname',
+            TRANSLATED_FIELDS,
+        )
+        result[todo_type] = dict(section, furnitype=records)
+        changed.extend(section_changed)
+    return result, changed
+
+
+def translate_productdata(product_data, index, locale):
+    """
+    Retorna (ProductData traducido a locale, códigos que cambiaron)
+    product_data no se modifica, así que puede reutilizarse
+    """
+    section = product_data["productdata"]
+    records, changed = translate_records(
+        section["product"],
+        index.product_translations(locale),
+        'code',
+        ("name", "description"),
+    )
+    result = dict(product_data)
+    result["productdata"] = dict(section, product=records)
+    return result, changed
+
+
+def write_json_if_changed(path, data, force=False):
+    """
+    Escribe data en path a través de un archivo temporal, salvo que path
+    ya tenga exactamente ese contenido (o siempre, con force=True)
+    Retorna True si el archivo se reescribió
+    """
+    encoded = json.dumps(data, separators=(',', ':'))
+    if not force and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == encoded:
+                return False
+
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def load_base_data():
+    """
+    Carga FurnitureData.json y ProductData.json tal como están en disco
+    """
+    with open(FURNITUREDATA, 'r', encoding='utf-8') as f:
+        furniture_data = json.load(f)
+    with open(PRODUCTDATA, 'r', encoding='utf-8') as f:
+        product_data = json.load(f)
+    return furniture_data, product_data
+
+
+def write_translation(base_data, index, locale, output_dir, only_changed, force=False):
+    """
+    Traduce base_data (FurnitureData, ProductData) a locale según index y
+    escribe los dos archivos en output_dir junto con el resumen de cambios
+
+    Con only_changed=True un archivo se escribe solo si alguno de sus
+    registros cambió respecto de base_data (base_data es el mismo archivo
+    de salida); si no, se escribe solo si su contenido es distinto al que
+    ya está en disco. Retorna el resumen.
+    """
+    summary = {}
+    for file_name, data, translate_data in (
+        ('FurnitureData.json', base_data[0], translate_furnidata),
+        ('ProductData.json', base_data[1], translate_productdata),
+    ):
+        translated, changed = translate_data(data, index, locale)
+
+        # Save the updated JSON file only when a record changed
+        path = os.path.join(output_dir, file_name)
+        if only_changed:
+            rewritten = bool(changed or force)
+            if rewritten:
+                write_json_if_changed(path, translated, force=True)
+        else:
+            rewritten = write_json_if_changed(path, translated, force)
+        summary[file_name] = {
+            "changed": len(changed),
+            "rewritten": rewritten,
+            "sample": changed[:CHANGES_SAMPLE_LIMIT],
         }
-        if str(furniture_dict[classname]['description']).endswith("desc"):
-            furniture_dict[classname]['description'] = ""
-
-orig_furniture_data = {}
-# Load the JSON file
-with open('../assets/gamedata/FurnitureData.json', 'r', encoding='utf-8') as f:
-    orig_furniture_data = json.load(f)
-
-# Replace the name and description values with values from the XML file
-for todo_type in todo_types:
-    for furnitype in orig_furniture_data[todo_type]["furnitype"]:
-        classname = normalize_classnames(furnitype['classname'])
-        if classname in furniture_dict:
-            furnitype['name'] = furniture_dict[classname]['name']
-            furnitype['description'] = furniture_dict[classname]['description']
-            if "specialtype" in furniture_dict[classname]:
-                furnitype['specialtype'] = furniture_dict[classname]['specialtype']
-
-
-orig_product_dict = {}
-# Load the JSON file
-with open('../assets/gamedata/ProductData.json', 'r', encoding='utf-8') as f:
-    orig_product_dict = json.load(f)
-
-for product in orig_product_dict["productdata"]["product"]:
-    classname = normalize_classnames(product['code'])
-    if classname in furniture_dict:
-        product['name'] = furniture_dict[classname]['name']
-        product['description'] = furniture_dict[classname]['description']
-
-
-# Save the updated JSON file
-with open('../assets/gamedata/FurnitureData.json', 'w') as f:
-    json.dump(orig_furniture_data, f, separators=(',', ':'))
-
-with open('../assets/gamedata/ProductData.json', 'w') as f:
-    json.dump(orig_product_dict, f, separators=(',', ':'))
+
+    changes_path = os.path.join(output_dir, CHANGES_NAME)
+    with open(changes_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(changes_path + '.tmp', changes_path)
+    return summary
+
+
+def refresh_served_copies(output_dir, summary, renderer_config=None,
+                          keep_generations=DEFAULT_KEEP_GENERATIONS):
+    """
+    Pone al día lo que sirve nginx a partir de los archivos reescritos:
+    los .gz/.br que ya existían junto a ellos y, si output_dir fue
+    publicado con --hashed-names (tiene gamedata-files.json), la
+    generación con hash y renderer_config
+    """
+    rewritten = [
+        os.path.join(output_dir, file_name)
+        for file_name, changes in summary.items()
+        if changes["rewritten"]
+    ]
+    if not rewritten:
+        return
+
+    # Solo los que ya se servían precomprimidos; si no, gzip_static
+    # entregaría el .gz viejo sin traducir
+    precompressed = [
+        path for path in rewritten
+        if any(os.path.exists(f"{path}.{encoding}") for encoding in ("gz", "br"))
+    ]
+    if precompressed:
+        precompress_files(precompressed, output_dir, parallel=False)
+
+    if os.path.exists(os.path.join(output_dir, MAPPING_NAME)):
+        mapping = publish_hashed(output_dir)
+        if renderer_config:
+            if os.path.exists(renderer_config):
+                rewrite_renderer_config(renderer_config, mapping)
+                print(f"   ✅ {renderer_config} actualizado")
+            else:
+                print(f"   ⚠️  No existe {renderer_config}, no se actualizó")
+        collect_generations(output_dir, mapping, keep_generations)
+
+
+def print_summary(summary, prefix=""):
+    for file_name, changes in summary.items():
+        action = "reescrito" if changes["rewritten"] else "sin cambios en disco"
+        print(
+            f"🌐 {prefix}{file_name}: {changes['changed']} registros traducidos ({action})"
+        )
+
+
+def translate(force=False, renderer_config=None):
+    """
+    Traduce FurnitureData.json y ProductData.json en modo incremental
+
+    Solo se modifican los registros cuyo name, description o specialtype
+    cambian, y cada archivo se reescribe (de forma atómica) solo si cambió
+    alguno de sus registros; así los archivos sin cambios conservan su
+    contenido y fecha, y no invalidan el caché de los clientes. Los .gz/.br
+    y la generación con hash de los archivos reescritos se regeneran (ver
+    refresh_served_copies). Si ni las
+    traducciones ni las salidas cambiaron desde la última corrida no se
+    carga nada. Con force=True se traduce y se reescribe todo.
+    Retorna el resumen de cambios, o None si no hubo nada que hacer.
+    """
+    sources = [LOCALIZED_FURNIDATA, LOCALIZED_PRODUCTDATA]
+    outputs = [FURNITUREDATA, PRODUCTDATA]
+    manifest = BuildManifest(GAMEDATA_DIR)
+    if not force and manifest.is_fresh("translation", sources, TRANSLATOR_VERSION):
+        print("⏭️  Traducciones sin cambios desde la última corrida")
+        return None
+
+    with ClassnameIndex(GAMEDATA_DIR) as index:
+        index.ensure_gamedata(FURNITUREDATA, PRODUCTDATA)
+        index.ensure_locale(LOCALIZED_LOCALE, LOCALIZED_FURNIDATA, LOCALIZED_PRODUCTDATA)
+        summary = write_translation(
+            load_base_data(),
+            index,
+            LOCALIZED_LOCALE,
+            GAMEDATA_DIR,
+            only_changed=True,
+            force=force,
+        )
+    print_summary(summary)
+    refresh_served_copies(GAMEDATA_DIR, summary, renderer_config)
+
+    manifest.record("translation", sources, TRANSLATOR_VERSION, outputs)
+    # The conversion recorded the untranslated outputs, keep its cache valid
+    manifest.refresh_outputs(outputs)
+    manifest.save()
+    return summary
+
+
+def translate_locales(locales, output_root=LOCALES_DIR, workers=None, force=False):
+    """
+    Traduce los gamedata base a varios idiomas en una sola corrida
+
+    locales es un diccionario nombre -> directorio con furnidata.json y
+    productdata.json localizados. FurnitureData.json y ProductData.json
+    base se cargan una sola vez y no se modifican; cada idioma (su
+    diccionario, la traducción y la escritura) se procesa en paralelo en
+    workers procesos, por defecto uno por idioma hasta la cantidad de CPUs.
+    La salida va a output_root/<nombre>/, reescribiendo solo los archivos
+    cuyo contenido cambió. Los idiomas sin cambios en sus fuentes ni en la
+    base desde la última corrida se saltan. Retorna {nombre: resumen}.
+    """
+    os.makedirs(output_root, exist_ok=True)
+    manifest = BuildManifest(output_root)
+    pending = {}
+    for name, locale_dir in locales.items():
+        output_dir = os.path.join(output_root, name)
+        sources = [
+            FURNITUREDATA,
+            PRODUCTDATA,
+            os.path.join(locale_dir, 'furnidata.json'),
+            os.path.join(locale_dir, 'productdata.json'),
+        ]
+        outputs = [
+            os.path.join(output_dir, 'FurnitureData.json'),
+            os.path.join(output_dir, 'ProductData.json'),
+        ]
+        key = f"translation:{name}"
+        if not force and manifest.is_fresh(key, sources, TRANSLATOR_VERSION):
+            print(f"⏭️  {name}: traducciones sin cambios desde la última corrida")
+            continue
+        pending[name] = (locale_dir, output_dir, key, sources, outputs)
+
+    if not pending:
+        return {}
+
+    if workers is None:
+        workers = min(len(pending), os.cpu_count() or 1)
+    # The base data is indexed and loaded once here; with fork the workers share it
+    with ClassnameIndex(GAMEDATA_DIR) as index:
+        index.ensure_gamedata(FURNITUREDATA, PRODUCTDATA)
+    base_data = load_base_data()
+    jobs = [
+        (name, locale_dir, output_dir, force)
+        for name, (locale_dir, output_dir, *_) in pending.items()
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_locale_worker,
+            initargs=(base_data,),
+        ) as pool:
+            results = list(pool.map(_translate_locale, *zip(*jobs)))
+    else:
+        _init_locale_worker(base_data)
+        results = [_translate_locale(*job) for job in jobs]
+
+    summaries = {}
+    for (name, (_, _, key, sources, outputs)), summary in zip(pending.items(), results):
+        summaries[name] = summary
+        print_summary(summary, prefix=f"{name}/")
+        refresh_served_copies(os.path.join(output_root, name), summary)
+        manifest.record(key, sources, TRANSLATOR_VERSION, outputs)
+    manifest.save()
+    return summaries
+
+
+# Base data of the batch mode in each worker (see _init_locale_worker)
+_locale_base_data = None
+
+
+def _init_locale_worker(base_data):
+    global _locale_base_data
+    _locale_base_data = base_data
+
+
+def _translate_locale(name, locale_dir, output_dir, force):
+    """
+    Traduce un idioma sobre los gamedata base del worker y escribe su salida
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with ClassnameIndex(GAMEDATA_DIR) as index:
+        index.ensure_locale(
+            name,
+            os.path.join(locale_dir, 'furnidata.json'),
+            os.path.join(locale_dir, 'productdata.json'),
+        )
+        return write_translation(
+            _locale_base_data, index, name, output_dir, only_changed=False, force=force
+        )
+
+
+def parse_locale(value):
+    """
+    nombre=directorio para --locale
+    """
+    name, separator, locale_dir = value.partition('=')
+    if not separator or not name or not locale_dir:
+        raise argparse.ArgumentTypeError(f"se esperaba nombre=directorio: {value}")
+    return name, locale_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Traduce FurnitureData.json y ProductData.json con los gamedata localizados."
+        )
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Traducir y reescribir todo aunque nada haya cambiado.",
+    )
+    parser.add_argument(
+        "--locale",
+        action="append",
+        type=parse_locale,
+        metavar="NOMBRE=DIR",
+        help=(
+            "Modo batch: traducir al idioma NOMBRE con DIR/furnidata.json y "
+            "DIR/productdata.json (repetible). Los gamedata base no se modifican."
+        ),
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=LOCALES_DIR,
+        help=(
+            "Directorio de salida del modo batch, con un subdirectorio por idioma "
+            f"(default: {LOCALES_DIR})."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=(
+            "Procesos para cargar los idiomas en paralelo "
+            "(default: uno por idioma, hasta la cantidad de CPUs)."
+        ),
+    )
+    parser.add_argument(
+        "--renderer-config",
+        help=(
+            "renderer-config.json a reescribir si los gamedata se publican con "
+            "nombres con hash (convert_gamedata.py --hashed-names)."
+        ),
+    )
+    args = parser.parse_args()
+
+    if args.locale:
+        translate_locales(
+            dict(args.locale), args.output_dir, workers=args.workers, force=args.force
+        )
+    else:
+        translate(force=args.force, renderer_config=args.renderer_config)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
-import json
+import argparse
 import sys
 
+import catalog_db
+from classname_index import ClassnameIndex
+
+GAMEDATA_DIR = "../assets/gamedata"
+OUTPUT = "catalog_items.sql"
+# Rows per INSERT of the bulk mode, keeps each statement under max_allowed_packet
+ROWS_PER_INSERT = 1000
+# Mapping table of the bulk mode, dropped when the session ends
+MAPPING_TABLE = catalog_db.MAPPING_TABLE
+
 # this is dumb but easier than a mariadb python dependency
 
 
@@ -21,46 +31,131 @@ def sqlescape(str):
         }))
 
 
-known_names = []
-
-todo_types = ["roomitemtypes", "wallitemtypes"]
+def load_known_names(gamedata_dir=GAMEDATA_DIR):
+    # Names come from the shared classname index, rebuilt only when the gamedata changes
+    with ClassnameIndex(gamedata_dir) as index:
+        index.ensure_gamedata(gamedata_dir + "/FurnitureData.json",
+                              gamedata_dir + "/ProductData.json")
+        return [{"name": name, "classname": classname}
+                for classname, name in index.known_names()]
 
-# Load the JSON data from the file
-with open("../assets/gamedata/FurnitureData.json", encoding='utf-8') as f:
-    data = json.load(f)
-    for todo_type in todo_types:
-        for furni in data[todo_type]["furnitype"]:
-            known_names.append(
-                {"name": furni["name"], "classname": furni["classname"]})
 
-with open("../assets/gamedata/ProductData.json", encoding='utf-8') as f:
-    data = json.load(f)
-    for furni in data["productdata"]["product"]:
-        known_names.append({"name": furni["name"], "classname": furni["code"]})
+def latin1(value):
+    # remove non latin-1 characters, check the collation of the table
+    return value.encode("latin-1", "ignore").decode("latin-1")
 
 
-seen = set()
-known_names_copy = known_names
-known_names = []
-
-for dic in known_names_copy:
-    key = (dic['classname'])
-    if key in seen:
-        continue
+def escaped_names(known_names):
+    for furni in known_names:
+        # get rid of any unwanted characters for sql
+        if furni["name"] is None:
+            continue
+        # truncate before escaping, a cut escape sequence would escape the closing quote
+        furni_name = sqlescape(latin1(furni["name"])[:55])
+        classname = sqlescape(latin1(furni["classname"]))
+        yield classname, furni_name
 
-    known_names.append(dic)
-    seen.add(key)
 
-with open("catalog_items.sql", "w", encoding='utf-8') as f:
+def update_parameters(known_names):
+    # (catalog_name, item_name) for the executemany of the execute mode, no escaping needed
     for furni in known_names:
-        # get rid of any unwanted characters for sql and remove non latin-1 characters
-        # check the collation of the table
         if furni["name"] is None:
             continue
-        furni_name = sqlescape(furni["name"].encode(
-            "latin-1", "ignore").decode("latin-1"))[:55]
-        classname = sqlescape(furni["classname"].encode(
-            "latin-1", "ignore").decode("latin-1"))
+        classname = latin1(furni["classname"])
+        yield classname, classname
+
+
+def write_updates(f, known_names):
+    # one correlated update per classname
+    for classname, furni_name in escaped_names(known_names):
         #f.write(f"UPDATE catalog_items ci SET ci.catalog_name = '{furni_name}' WHERE item_ids IN (SELECT CAST(id AS CHAR) FROM items_base WHERE item_name = '{classname}');\n")
         f.write(
             f"UPDATE catalog_items ci, (SELECT CAST(id AS CHAR) as id, item_name FROM items_base WHERE item_name = '{classname}') item SET ci.catalog_name = '{classname}' WHERE ci.item_ids = item.id;\n")
+
+
+def write_bulk_update(f, known_names, rows_per_insert=ROWS_PER_INSERT):
+    # load every classname into a temporary table and update the catalog with a single join
+    # catalog_name gets the classname like the per-row updates, so only the classname is loaded
+    f.write(
+        f"CREATE TEMPORARY TABLE {MAPPING_TABLE} ("
+        "classname VARCHAR(255) NOT NULL, "
+        # not unique, classnames differing only in case are kept like the per-row updates do
+        "KEY (classname));\n")
+    rows = []
+    for classname, _ in escaped_names(known_names):
+        rows.append(f"('{classname}')")
+        if len(rows) == rows_per_insert:
+            f.write(f"INSERT INTO {MAPPING_TABLE} (classname) VALUES\n"
+                    + ",\n".join(rows) + ";\n")
+            rows = []
+    if rows:
+        f.write(f"INSERT INTO {MAPPING_TABLE} (classname) VALUES\n"
+                + ",\n".join(rows) + ";\n")
+    f.write(
+        "UPDATE catalog_items ci "
+        "JOIN items_base item ON ci.item_ids = CAST(item.id AS CHAR) "
+        f"JOIN {MAPPING_TABLE} m ON item.item_name = m.classname "
+        "SET ci.catalog_name = m.classname;\n")
+    f.write(f"DROP TEMPORARY TABLE {MAPPING_TABLE};\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate the catalog_items.catalog_name updates from the gamedata")
+    parser.add_argument("--bulk", action="store_true",
+                        help="one multi-row INSERT into a temporary table and a single joined UPDATE")
+    parser.add_argument("--rows-per-insert", type=int, default=ROWS_PER_INSERT,
+                        help=f"rows per INSERT in bulk mode (default {ROWS_PER_INSERT})")
+    parser.add_argument("--output", default=OUTPUT,
+                        help=f"SQL file to write (default {OUTPUT})")
+    execute = parser.add_argument_group(
+        "execute", "run the updates on the database instead of writing a SQL file")
+    execute.add_argument("--execute", action="store_true",
+                         help="connect to MySQL (needs PyMySQL, defaults from the DB_* variables)")
+    execute.add_argument("--host")
+    execute.add_argument("--port", type=int)
+    execute.add_argument("--user")
+    execute.add_argument("--password")
+    execute.add_argument("--database")
+    execute.add_argument("--sqlite", metavar="PATH",
+                         help="run against a local SQLite stand-in of items_base/catalog_items")
+    execute.add_argument("--seed", type=int, metavar="N",
+                         help="fill the SQLite stand-in first with N catalog items per known classname")
+    execute.add_argument("--batch-size", type=int, default=catalog_db.DEFAULT_BATCH_SIZE,
+                         help=f"rows per transaction (default {catalog_db.DEFAULT_BATCH_SIZE})")
+    execute.add_argument("--retries", type=int, default=catalog_db.DEFAULT_RETRIES,
+                         help=f"retries of a failed batch (default {catalog_db.DEFAULT_RETRIES})")
+    args = parser.parse_args(argv)
+    if args.rows_per_insert < 1:
+        parser.error("--rows-per-insert must be at least 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.retries < 0:
+        parser.error("--retries can't be negative")
+    if args.seed is not None and not args.sqlite:
+        parser.error("--seed only works with --sqlite")
+
+    known_names = load_known_names()
+
+    if args.execute or args.sqlite:
+        if args.sqlite:
+            catalog = catalog_db.SQLiteCatalog(args.sqlite)
+            if args.seed is not None:
+                catalog.seed((furni["classname"] for furni in known_names), args.seed)
+        else:
+            catalog = catalog_db.MySQLCatalog(
+                args.host, args.port, args.user, args.password, args.database)
+        with catalog:
+            catalog_db.sync_catalog_names(
+                catalog, update_parameters(known_names), args.batch_size, args.retries)
+        return
+
+    with open(args.output, "w", encoding='utf-8') as f:
+        if args.bulk:
+            write_bulk_update(f, known_names, args.rows_per_insert)
+        else:
+            write_updates(f, known_names)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Manifiesto de build para las conversiones de gamedata
+Guarda los hashes de los archivos de origen, la versión del conversor y
+los hashes de las salidas, para saltar conversiones que no cambiaron
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".gamedata-manifest.json"
+MANIFEST_FORMAT = 1
+
+
+def file_sha256(file_path):
+    """
+    Calcula el sha256 de un archivo leyéndolo por bloques
+    Retorna None si el archivo no existe
+    """
+    if not os.path.exists(file_path):
+        return None
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Manifiesto persistente ubicado junto a las salidas
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT:
+                self.entries = data.get("conversions", {})
+        except (OSError, ValueError):
+            # Manifiesto inexistente o corrupto: se reconstruye desde cero
+            self.entries = {}
+
+    def is_fresh(self, key, source_paths, converter_version):
+        """
+        True si las fuentes y la versión coinciden con el último build y
+        todas las salidas registradas siguen intactas en disco
+        """
+        entry = self.entries.get(key)
+        if not entry or entry.get("converter_version") != converter_version:
+            return False
+
+        sources = entry.get("sources", {})
+        if set(sources) != set(source_paths):
+            return False
+        for path in source_paths:
+            if sources[path] != file_sha256(path):
+                return False
+
+        outputs = entry.get("outputs", {})
+        if not outputs:
+            return False
+        for path, digest in outputs.items():
+            if file_sha256(path) != digest:
+                return False
+
+        return True
+
+    def record(self, key, source_paths, converter_version, output_paths):
+        """
+        Registra el resultado de una conversión exitosa
+        """
+        self.entries[key] = {
+            "converter_version": converter_version,
+            "sources": {path: file_sha256(path) for path in source_paths},
+            "outputs": {path: file_sha256(path) for path in output_paths},
+        }
+
+    def refresh_outputs(self, output_paths):
+        """
+        Actualiza el hash de output_paths en todas las entradas que los
+        registraron como salida, para los pasos que los modifican en su
+        lugar después de generarlos (por ejemplo la traducción)
+        """
+        digests = {}
+        for path in output_paths:
+            digest = file_sha256(path)
+            if digest is not None:
+                digests[os.path.realpath(path)] = digest
+
+        for entry in self.entries.values():
+            outputs = entry.get("outputs", {})
+            for path in outputs:
+                digest = digests.get(os.path.realpath(path))
+                if digest is not None:
+                    outputs[path] = digest
+
+    def forget(self, key):
+        """
+        Elimina una entrada, por ejemplo cuando su conversión falla
+        """
+        self.entries.pop(key, None)
+
+    def save(self):
+        """
+        Escribe el manifiesto de forma atómica
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"format": MANIFEST_FORMAT, "conversions": self.entries},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Sincronización directa de catalog_items.catalog_name contra la base de datos
+Cada lote de batch_size filas se carga con executemany en una tabla
+temporal (classname, catalog_name) y se aplica con un único UPDATE
+unido, en su propia transacción: los locks duran solo lo que tarda un
+lote, y un lote que falla por un error transitorio se reintenta.
+SQLiteCatalog es un doble local de items_base/catalog_items para
+probar y medir sin un MySQL en marcha.
+"""
+
+import os
+import sqlite3
+import time
+
+try:
+    import pymysql
+except ImportError:  # PyMySQL solo hace falta para conectarse a MySQL
+    pymysql = None
+
+# Filas por transacción
+DEFAULT_BATCH_SIZE = 500
+# Reintentos de un lote tras un error transitorio
+DEFAULT_RETRIES = 3
+# Segundos de espera antes del primer reintento, se duplica en cada uno
+RETRY_DELAY = 1.0
+# Tabla temporal de la sesión con los pares (classname, catalog_name)
+MAPPING_TABLE = "catalog_name_sync"
+
+# Solo las columnas que usa la sincronización; sin índices en item_name
+# ni item_ids, igual que en la base de Arcturus
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items_base (
+    id INTEGER PRIMARY KEY,
+    item_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_items (
+    id INTEGER PRIMARY KEY,
+    item_ids TEXT NOT NULL,
+    catalog_name TEXT NOT NULL DEFAULT ''
+);
+"""
+
+
+class _Catalog:
+    """
+    Base de las conexiones: cada una define sus sentencias para la tabla
+    temporal y el UPDATE unido, y los errores que se consideran transitorios
+    """
+
+    prepare_statements = ()
+    insert_statement = None
+    update_statement = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def reconnect(self):
+        pass
+
+    def update_batch(self, batch):
+        """
+        Aplica batch, pares (catalog_name, item_name), sin hacer commit
+        """
+        cursor = self.connection.cursor()
+        try:
+            for statement in self.prepare_statements:
+                cursor.execute(statement)
+            cursor.executemany(self.insert_statement, batch)
+            cursor.execute(self.update_statement)
+        finally:
+            cursor.close()
+
+
+class MySQLCatalog(_Catalog):
+    """
+    Conexión a la base de datos del emulador; los valores por defecto
+    salen de las mismas variables DB_* del .env
+    """
+
+    # La tabla temporal se pierde al reconectar, por eso se crea en cada lote
+    prepare_statements = (
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {MAPPING_TABLE} ("
+        "classname VARCHAR(255) NOT NULL, catalog_name VARCHAR(255) NOT NULL, "
+        "KEY (classname))",
+        f"DELETE FROM {MAPPING_TABLE}",
+    )
+    insert_statement = (
+        f"INSERT INTO {MAPPING_TABLE} (catalog_name, classname) VALUES (%s, %s)"
+    )
+    # items_base.item_name y catalog_items.item_ids no tienen índice: un
+    # UPDATE unido por lote recorre las tablas una vez en lugar de una por fila
+    update_statement = (
+        "UPDATE catalog_items ci "
+        "JOIN items_base item ON ci.item_ids = CAST(item.id AS CHAR) "
+        f"JOIN {MAPPING_TABLE} m ON item.item_name = m.classname "
+        "SET ci.catalog_name = m.catalog_name"
+    )
+
+    def __init__(self, host=None, port=None, user=None, password=None, database=None):
+        if pymysql is None:
+            raise RuntimeError("PyMySQL no está instalado (pip install PyMySQL)")
+        # Con la conexión perdida PyMySQL cierra el socket y lo siguiente
+        # (el rollback) falla con InterfaceError
+        self.transient_errors = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+        self.connection = pymysql.connect(
+            host=host or os.environ.get("DB_HOSTNAME", "localhost"),
+            port=int(port or os.environ.get("DB_PORT", 3306)),
+            user=user or os.environ.get("DB_USERNAME", "arcturus_user"),
+            password=password if password is not None else os.environ.get("DB_PASSWORD", ""),
+            database=database or os.environ.get("DB_DATABASE", "arcturus"),
+            charset="utf8mb4",
+            autocommit=False,
+        )
+
+    def reconnect(self):
+        self.connection.ping(reconnect=True)
+
+
+class SQLiteCatalog(_Catalog):
+    """
+    Doble local de items_base/catalog_items en un archivo SQLite
+    (o ":memory:"), con la misma interfaz y el mismo plan que MySQLCatalog
+    """
+
+    prepare_statements = (
+        f"CREATE TEMP TABLE IF NOT EXISTS {MAPPING_TABLE} ("
+        "classname TEXT NOT NULL, catalog_name TEXT NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS temp.{MAPPING_TABLE}_classname "
+        f"ON {MAPPING_TABLE} (classname)",
+        f"DELETE FROM {MAPPING_TABLE}",
+    )
+    insert_statement = (
+        f"INSERT INTO {MAPPING_TABLE} (catalog_name, classname) VALUES (?, ?)"
+    )
+    update_statement = (
+        "UPDATE catalog_items SET catalog_name = m.catalog_name "
+        f"FROM items_base item JOIN {MAPPING_TABLE} m ON item.item_name = m.classname "
+        "WHERE catalog_items.item_ids = CAST(item.id AS TEXT)"
+    )
+    transient_errors = (sqlite3.OperationalError,)
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=5)
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    def seed(self, classnames, catalog_items_per_item=1):
+        """
+        Reemplaza el contenido por un items_base con cada classname y
+        catalog_items_per_item entradas de catálogo para cada uno
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM catalog_items")
+            self.connection.execute("DELETE FROM items_base")
+            self.connection.executemany(
+                "INSERT INTO items_base (id, item_name) VALUES (?, ?)",
+                enumerate(classnames, 1),
+            )
+            self.connection.execute(
+                "INSERT INTO catalog_items (item_ids) "
+                "SELECT CAST(id AS TEXT) FROM items_base, "
+                "(WITH RECURSIVE copies(n) AS "
+                "(SELECT 1 UNION ALL SELECT n + 1 FROM copies WHERE n < ?) "
+                "SELECT n FROM copies) ORDER BY id",
+                (catalog_items_per_item,),
+            )
+
+    def catalog_names(self):
+        """
+        {item_ids: catalog_name} de todo catalog_items
+        """
+        return dict(
+            self.connection.execute("SELECT item_ids, catalog_name FROM catalog_items")
+        )
+
+
+def _rollback(catalog):
+    try:
+        catalog.connection.rollback()
+    except catalog.transient_errors:
+        # Conexión ya cerrada: no hay transacción que deshacer
+        pass
+
+
+def _execute_batch(catalog, batch, retries, sleep):
+    delay = RETRY_DELAY
+    for attempt in range(retries + 1):
+        try:
+            if attempt:
+                catalog.reconnect()
+            catalog.update_batch(batch)
+            catalog.connection.commit()
+            return
+        except catalog.transient_errors as e:
+            _rollback(catalog)
+            if attempt == retries:
+                raise
+            print(f"⚠️ Lote fallido ({e}), reintento {attempt + 1}/{retries} en {delay:g}s")
+            sleep(delay)
+            delay *= 2
+
+
+def sync_catalog_names(
+    catalog,
+    updates,
+    batch_size=DEFAULT_BATCH_SIZE,
+    retries=DEFAULT_RETRIES,
+    progress=True,
+    sleep=time.sleep,
+):
+    """
+    Ejecuta updates, pares (catalog_name, item_name), en transacciones de
+    batch_size filas; retorna la cantidad de filas enviadas
+    """
+    updates = list(updates)
+    total = len(updates)
+    start = time.perf_counter()
+    for done in range(0, total, batch_size):
+        batch = updates[done : done + batch_size]
+        _execute_batch(catalog, batch, retries, sleep)
+        if progress:
+            sent = done + len(batch)
+            print(
+                f"🔄 {sent}/{total} nombres sincronizados "
+                f"({sent * 100 // total}%, {time.perf_counter() - start:.1f}s)"
+            )
+    return total
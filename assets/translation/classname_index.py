@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Índice persistente de classnames normalizados de los gamedata
+Guarda en SQLite, junto a FurnitureData.json, cada furnitype y producto
+con su classname normalizado, y los nombres localizados de cada idioma.
+Cada parte se reconstruye solo cuando cambia el sha256 de sus archivos
+de origen, así que las herramientas de traducción consultan el índice
+en lugar de recorrer y normalizar los JSON en cada corrida.
+
+sprite_id es el id de furnidata (items_base.sprite_id).
+"""
+
+import json
+import os
+import sqlite3
+
+from build_manifest import file_sha256
+from furnidata_schema import SECTIONS
+
+INDEX_NAME = ".classname-index.sqlite"
+# Incrementar cuando cambie el esquema o cómo se llenan las tablas
+INDEX_FORMAT = "1"
+
+# Las columnas de valores no tienen tipo para conservar el tipo del JSON
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS furni (
+    section TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    sprite_id,
+    classname TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    name,
+    PRIMARY KEY (section, position)
+);
+CREATE INDEX IF NOT EXISTS furni_normalized ON furni (normalized);
+CREATE TABLE IF NOT EXISTS products (
+    position INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    name
+);
+CREATE INDEX IF NOT EXISTS products_normalized ON products (normalized);
+CREATE TABLE IF NOT EXISTS translations (
+    locale TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    name,
+    description,
+    specialtype,
+    has_specialtype INTEGER NOT NULL,
+    PRIMARY KEY (locale, normalized)
+);
+"""
+TABLES = ("meta", "furni", "products", "translations")
+
+
+def normalize_classnames(classname):
+    return str(classname).replace("_", "").replace(" ", "")
+
+
+def sources_digest(paths):
+    """
+    Hash combinado del contenido de varios archivos
+    """
+    return ",".join(str(file_sha256(path)) for path in paths)
+
+
+def _localized_description(description):
+    # Las descripciones sin traducir terminan en "desc"
+    return "" if str(description).endswith("desc") else description
+
+
+class ClassnameIndex:
+    """
+    Conexión al índice de un directorio de gamedata
+    Se usa como context manager; cada proceso abre su propia conexión
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, INDEX_NAME)
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        if self._meta("format") != INDEX_FORMAT:
+            # Índice de otra versión: se descarta todo
+            with self.connection:
+                for table in TABLES:
+                    self.connection.execute(f"DROP TABLE {table}")
+            self.connection.executescript(SCHEMA)
+            with self.connection:
+                self._set_meta("format", INDEX_FORMAT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _meta(self, key):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def ensure_gamedata(self, furnituredata_path, productdata_path):
+        """
+        Indexa FurnitureData.json y ProductData.json si su contenido
+        cambió desde la última vez; retorna True si se reconstruyó
+        """
+        digest = sources_digest((furnituredata_path, productdata_path))
+        if self._meta("gamedata") == digest:
+            return False
+
+        with open(furnituredata_path, "r", encoding="utf-8") as f:
+            furniture_data = json.load(f)
+        with open(productdata_path, "r", encoding="utf-8") as f:
+            product_data = json.load(f)
+
+        with self.connection:
+            self.connection.execute("DELETE FROM furni")
+            self.connection.execute("DELETE FROM products")
+            for section in SECTIONS:
+                self.connection.executemany(
+                    "INSERT INTO furni VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            section,
+                            position,
+                            furnitype.get("id"),
+                            furnitype["classname"],
+                            normalize_classnames(furnitype["classname"]),
+                            furnitype.get("name"),
+                        )
+                        for position, furnitype in enumerate(
+                            furniture_data[section]["furnitype"]
+                        )
+                    ),
+                )
+            self.connection.executemany(
+                "INSERT INTO products VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        position,
+                        product["code"],
+                        normalize_classnames(product["code"]),
+                        product.get("name"),
+                    )
+                    for position, product in enumerate(
+                        product_data["productdata"]["product"]
+                    )
+                ),
+            )
+            self._set_meta("gamedata", digest)
+        return True
+
+    def ensure_locale(self, locale, furnidata_path, productdata_path):
+        """
+        Indexa los nombres localizados de locale (furnidata.json y
+        productdata.json de ese idioma) si su contenido cambió; los
+        productos pisan a los furnitypes con el mismo classname normalizado
+        Retorna True si se reconstruyó
+        """
+        digest = sources_digest((furnidata_path, productdata_path))
+        if self._meta(f"locale:{locale}") == digest:
+            return False
+
+        translations = {}
+        with open(furnidata_path, "r", encoding="utf-8") as f:
+            furniture_data = json.load(f)
+        for section in SECTIONS:
+            for furnitype in furniture_data[section]["furnitype"]:
+                translations[normalize_classnames(furnitype["classname"])] = (
+                    furnitype["name"],
+                    _localized_description(furnitype["description"]),
+                    furnitype["specialtype"],
+                    1,
+                )
+        with open(productdata_path, "r", encoding="utf-8") as f:
+            product_data = json.load(f)
+        for product in product_data["productdata"]["product"]:
+            translations[normalize_classnames(product["code"])] = (
+                product["name"],
+                _localized_description(product["description"]),
+                None,
+                0,
+            )
+
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM translations WHERE locale = ?", (locale,)
+            )
+            self.connection.executemany(
+                "INSERT INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (locale, normalized, *values)
+                    for normalized, values in translations.items()
+                ),
+            )
+            self._set_meta(f"locale:{locale}", digest)
+        return True
+
+    @staticmethod
+    def _translation(name, description, specialtype, has_specialtype):
+        translation = {"name": name, "description": description}
+        if has_specialtype:
+            translation["specialtype"] = specialtype
+        return translation
+
+    def furni_translations(self, locale, section):
+        """
+        (posición, traducción) de los furnitypes de section que tienen
+        traducción en locale, en orden
+        """
+        rows = self.connection.execute(
+            """
+            SELECT f.position, t.name, t.description, t.specialtype, t.has_specialtype
+            FROM furni f
+            JOIN translations t ON t.locale = ? AND t.normalized = f.normalized
+            WHERE f.section = ?
+            ORDER BY f.position
+            """,
+            (locale, section),
+        )
+        return [(row[0], self._translation(*row[1:])) for row in rows]
+
+    def product_translations(self, locale):
+        """
+        (posición, traducción) de los productos que tienen traducción en
+        locale, en orden
+        """
+        rows = self.connection.execute(
+            """
+            SELECT p.position, t.name, t.description, t.specialtype, t.has_specialtype
+            FROM products p
+            JOIN translations t ON t.locale = ? AND t.normalized = p.normalized
+            ORDER BY p.position
+            """,
+            (locale,),
+        )
+        return [(row[0], self._translation(*row[1:])) for row in rows]
+
+    def known_names(self):
+        """
+        (classname, name) de los furnitypes (room y después wall) y luego
+        de los productos, sin classnames repetidos
+        """
+        rows = self.connection.execute(
+            """
+            SELECT classname, name FROM (
+                SELECT classname, name, section = 'wallitemtypes' AS part, position
+                FROM furni
+                UNION ALL
+                SELECT code, name, 2, position FROM products
+            )
+            ORDER BY part, position
+            """
+        )
+        seen = set()
+        names = []
+        for classname, name in rows:
+            if classname not in seen:
+                seen.add(classname)
+                names.append((classname, name))
+        return names
+
+    def normalized_classnames(self):
+        """
+        Conjunto de classnames normalizados de furnitypes y productos
+        """
+        rows = self.connection.execute(
+            "SELECT normalized FROM furni UNION SELECT normalized FROM products"
+        )
+        return {row[0] for row in rows}
+
+    def lookup(self, classname, locale=None):
+        """
+        Furnitypes y productos cuyo classname normalizado coincide con el
+        de classname y, si se indica locale, su traducción en ese idioma
+        """
+        normalized = normalize_classnames(classname)
+        furni = self.connection.execute(
+            "SELECT section, sprite_id, classname, name FROM furni WHERE normalized = ?",
+            (normalized,),
+        )
+        products = self.connection.execute(
+            "SELECT code, name FROM products WHERE normalized = ?", (normalized,)
+        )
+        result = {
+            "furni": [
+                dict(zip(("section", "sprite_id", "classname", "name"), row))
+                for row in furni
+            ],
+            "products": [dict(zip(("code", "name"), row)) for row in products],
+        }
+        if locale is not None:
+            row = self.connection.execute(
+                """
+                SELECT name, description, specialtype, has_specialtype
+                FROM translations WHERE locale = ? AND normalized = ?
+                """,
+                (locale, normalized),
+            ).fetchone()
+            result["translation"] = self._translation(*row) if row else None
+        return result
@@ -1,33 +1,15 @@
-import json
 import glob
 import os
 
 from fuzzywuzzy import process, fuzz
 
-def normalize_classnames(classname):
-    return str(classname).replace("_", "").replace(" ", "")
+from classname_index import ClassnameIndex, normalize_classnames
 
-todo_types = ["roomitemtypes", "wallitemtypes"]
-
-orig_furniture_data = {}
-# Load the JSON file
-with open('../assets/gamedata/FurnitureData.json', 'r', encoding='utf-8') as f:
-    orig_furniture_data = json.load(f)
-
-orig_product_dict = {}
-# Load the JSON file
-with open('../assets/gamedata/ProductData.json', 'r', encoding='utf-8') as f:
-    orig_product_dict = json.load(f)
-
-classnames = set()
-
-for todo_type in todo_types:
-    for furnitype in orig_furniture_data[todo_type]["furnitype"]:
-        classnames.add(normalize_classnames(furnitype['classname']))
-
-
-for product in orig_product_dict["productdata"]["product"]:
-    classnames.add(normalize_classnames(product['code']))
+# Known classnames come from the shared classname index, rebuilt only when the gamedata changes
+with ClassnameIndex('../assets/gamedata') as classname_index:
+    classname_index.ensure_gamedata('../assets/gamedata/FurnitureData.json',
+                                    '../assets/gamedata/ProductData.json')
+    classnames = classname_index.normalized_classnames()
 
 not_matched = set()
 nitro_files = glob.glob("../assets/bundled/furniture/*.nitro")
@@ -5,12 +5,41 @@ Diseñado para ejecutarse dentro del contenedor assets
 Incluye reparación automática de XML corrupto
 """
 
+import argparse
+import contextlib
+import functools
+import io
 import json
 import os
 import sys
 import subprocess
+import time
 import xml.etree.ElementTree as ET
-import re
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import BuildManifest, file_sha256
+from furnidata_shards import (
+    DEFAULT_SHARD_SIZE,
+    SHARD_DIR_NAME,
+    SHARD_MODES,
+    FurnitureShardWriter,
+    shard_files,
+)
+from furnidata_stream import FurnitypeQuarantine, write_furnidata_json
+from gamedata_publish import (
+    DEFAULT_KEEP_GENERATIONS,
+    collect_generations,
+    publish_hashed,
+    rewrite_renderer_config,
+)
+from precompress import gamedata_files, precompress_files
+from productdata_stream import write_productdata_json
+from xml_check import is_well_formed
+
+try:
+    from xml_patch import CachedRepairStream, RepairPatchCache
+except ImportError:  # sin el módulo se usa fix_xml_specific.py en un proceso aparte
+    CachedRepairStream = None
 
 
 def figuredata_xml_to_json(xml_file_path, json_file_path):
@@ -95,6 +124,13 @@ def figuredata_xml_to_json(xml_file_path, json_file_path):
         return False
 
 
+def furnidata_shard_dir(json_file_path):
+    """
+    Directorio de shards correspondiente a un FurnitureData.json
+    """
+    return os.path.join(os.path.dirname(json_file_path), SHARD_DIR_NAME)
+
+
 def repair_xml_file(xml_file_path):
     """
     Repara archivos XML corruptos antes de procesarlos
@@ -132,91 +168,97 @@ def repair_xml_file(xml_file_path):
         return False
 
 
-def furnidata_xml_to_json(xml_file_path, json_file_path):
+# Registros de furnidata.xml que no se pudieron convertir, junto al XML
+QUARANTINE_SUFFIX = ".quarantine.jsonl"
+
+
+def furnidata_xml_to_json(
+    xml_file_path,
+    json_file_path,
+    shard_by=None,
+    shard_size=DEFAULT_SHARD_SIZE,
+    repair_workers=1,
+):
     """
     Convierte furnidata.xml a FurnitureData.json
+    Con shard_by ("id" o "category") también escribe los shards y su índice
+    en el directorio furnidata/ junto a FurnitureData.json
+    Con repair_workers > 1 la reparación, si hace falta, se hace en paralelo
+    Si el XML necesitó reparación se parsea registro por registro: los
+    furnitypes que siguen corruptos se guardan en furnidata.xml.quarantine.jsonl
     """
     try:
         print("🔧 Reparando y procesando archivo XML...")
 
-        # Try to repair the XML file first
-        repair_xml_file(xml_file_path)
+        with contextlib.ExitStack() as stack:
+            # Well-formed XML (the usual case) is parsed as is. Otherwise
+            # repair it while it is parsed when the repair module is
+            # available, or rewrite the file with fix_xml_specific.py
+            # A source that was repaired before reuses its saved patch
+            repairing = False
+            digest = file_sha256(xml_file_path)
+            well_formed = is_well_formed(xml_file_path, digest=digest)
+            if well_formed:
+                print("✅ XML bien formado, se omite la reparación")
+                xml_source = xml_file_path
+            elif CachedRepairStream is not None:
+                repairing = True
+                patches = RepairPatchCache(os.path.dirname(os.path.abspath(xml_file_path)))
+                xml_source = stack.enter_context(
+                    CachedRepairStream(xml_file_path, digest, patches, repair_workers)
+                )
+                if xml_source.from_patch:
+                    print("♻️  Aplicando parche de reparación guardado...")
+                else:
+                    print("🛠️  Reparando XML en streaming durante el parseo...")
+            else:
+                repair_xml_file(xml_file_path)
+                xml_source = xml_file_path
+
+            # Repaired XML is parsed one furnitype at a time in recovery mode,
+            # so records the repair could not fix are quarantined (with their
+            # offsets in the original file) instead of aborting the conversion
+            quarantine = stack.enter_context(
+                FurnitypeQuarantine(
+                    xml_file_path + QUARANTINE_SUFFIX,
+                    source_offset=xml_source.source_offset if repairing else None,
+                )
+            )
 
-        # Parse the XML
-        print("🔍 Parseando archivo XML...")
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
+            # Parse and write the XML incrementally, one furnitype at a time
+            print("🔍 Parseando archivo XML en streaming...")
+            if shard_by:
+                shard_dir = furnidata_shard_dir(json_file_path)
+                with FurnitureShardWriter(shard_dir, shard_by, shard_size) as shards:
+                    room_count, wall_count = write_furnidata_json(
+                        xml_source,
+                        json_file_path,
+                        on_record=shards.add,
+                        recover=not well_formed,
+                        quarantine=quarantine,
+                    )
+                print(f"🧩 {len(shards.shards)} shards escritos en {shard_dir}")
+            else:
+                room_count, wall_count = write_furnidata_json(
+                    xml_source,
+                    json_file_path,
+                    recover=not well_formed,
+                    quarantine=quarantine,
+                )
+
+            if repairing:
+                print(
+                    f"✅ XML reparado exitosamente ({xml_source.report.total} correcciones)"
+                )
+            if quarantine.count:
+                print(
+                    f"⚠️  {quarantine.count} furnitypes corruptos en cuarentena: {quarantine.path}"
+                )
         print("✅ XML parsing exitoso")
-
-        # Initialize the result dictionary
-        result = {
-            "roomitemtypes": {"furnitype": []},
-            "wallitemtypes": {"furnitype": []},
-        }
-
-        # Process roomitemtypes
-        roomitemtypes = root.find("roomitemtypes")
-        if roomitemtypes is not None:
-            for furnitype in roomitemtypes.findall("furnitype"):
-                furni_data = {
-                    "id": int(furnitype.get("id", 0)),
-                    "classname": furnitype.get("classname", ""),
-                    "revision": int(furnitype.findtext("revision", 0)),
-                    "category": furnitype.findtext("category", ""),
-                    "defaultdir": int(furnitype.findtext("defaultdir", 0)),
-                    "xdim": int(furnitype.findtext("xdim", 1)),
-                    "ydim": int(furnitype.findtext("ydim", 1)),
-                    "name": furnitype.findtext("name", ""),
-                    "description": furnitype.findtext("description", ""),
-                    "adurl": furnitype.findtext("adurl", ""),
-                    "offerid": int(furnitype.findtext("offerid", -1)),
-                    "buyout": int(furnitype.findtext("buyout", 0)),
-                    "rentofferid": int(furnitype.findtext("rentofferid", -1)),
-                    "rentbuyout": int(furnitype.findtext("rentbuyout", 0)),
-                    "bc": int(furnitype.findtext("bc", 0)),
-                    "excludeddynamic": int(furnitype.findtext("excludeddynamic", 0)),
-                    "customparams": furnitype.findtext("customparams", ""),
-                    "specialtype": int(furnitype.findtext("specialtype", 1)),
-                    "canstandon": int(furnitype.findtext("canstandon", 0)),
-                    "cansiton": int(furnitype.findtext("cansiton", 0)),
-                    "canlayon": int(furnitype.findtext("canlayon", 0)),
-                    "furniline": furnitype.findtext("furniline", ""),
-                    "environment": furnitype.findtext("environment", ""),
-                    "rare": int(furnitype.findtext("rare", 0)),
-                }
-                result["roomitemtypes"]["furnitype"].append(furni_data)
-
-        # Process wallitemtypes
-        wallitemtypes = root.find("wallitemtypes")
-        if wallitemtypes is not None:
-            for furnitype in wallitemtypes.findall("furnitype"):
-                furni_data = {
-                    "id": int(furnitype.get("id", 0)),
-                    "classname": furnitype.get("classname", ""),
-                    "revision": int(furnitype.findtext("revision", 0)),
-                    "category": furnitype.findtext("category", ""),
-                    "name": furnitype.findtext("name", ""),
-                    "description": furnitype.findtext("description", ""),
-                    "adurl": furnitype.findtext("adurl", ""),
-                    "offerid": int(furnitype.findtext("offerid", -1)),
-                    "buyout": int(furnitype.findtext("buyout", 0)),
-                    "rentofferid": int(furnitype.findtext("rentofferid", -1)),
-                    "rentbuyout": int(furnitype.findtext("rentbuyout", 0)),
-                    "bc": int(furnitype.findtext("bc", 0)),
-                    "excludeddynamic": int(furnitype.findtext("excludeddynamic", 0)),
-                    "customparams": furnitype.findtext("customparams", ""),
-                    "specialtype": int(furnitype.findtext("specialtype", 1)),
-                    "furniline": furnitype.findtext("furniline", ""),
-                    "environment": furnitype.findtext("environment", ""),
-                    "rare": int(furnitype.findtext("rare", 0)),
-                }
-                result["wallitemtypes"]["furnitype"].append(furni_data)
-
-        # Write JSON file
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, separators=(",", ":"))
-
         print(f"✅ FurnitureData.json generado exitosamente!")
+        print(
+            f"📊 Elementos procesados: {room_count} room items, {wall_count} wall items"
+        )
         return True
 
     except Exception as e:
@@ -224,61 +266,16 @@ def furnidata_xml_to_json(xml_file_path, json_file_path):
         return False
 
 
-def productdata_txt_to_json(txt_file_path, json_file_path):
+def productdata_txt_to_json(txt_file_path, json_file_path, workers=1):
     """
     Convierte productdata.txt a ProductData.json
+    Con workers > 1 las líneas se decodifican en paralelo
     """
     try:
-        # Initialize the result dictionary
-        result = {"productdata": {"product": []}}
-
-        # Read the text file with better error handling
-        with open(txt_file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-
-        # Clean content from control characters
-        import re
-
-        content = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", content)
-
-        # Parse each line as a JSON array
-        lines = content.strip().split("\n")
-        processed_count = 0
-        error_count = 0
-
-        for line_num, line in enumerate(lines, 1):
-            if line.strip():
-                try:
-                    # Clean the line further
-                    line = line.strip()
-
-                    # Parse the line as JSON array
-                    products_array = json.loads(line)
-
-                    # Process each product in the array
-                    for product_info in products_array:
-                        if len(product_info) >= 3:
-                            # Clean the product data
-                            product_data = {
-                                "code": str(product_info[0]).strip(),
-                                "name": str(product_info[1]).strip(),
-                                "description": str(product_info[2]).strip(),
-                            }
-                            result["productdata"]["product"].append(product_data)
-                            processed_count += 1
-
-                except json.JSONDecodeError as e:
-                    error_count += 1
-                    if error_count <= 5:  # Only show first 5 errors
-                        print(f"⚠️  Error línea {line_num}: {str(e)}")
-                except Exception as e:
-                    error_count += 1
-                    if error_count <= 5:
-                        print(f"⚠️  Error procesando línea {line_num}: {str(e)}")
-
-        # Write JSON file
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, separators=(",", ":"))
+        # Stream the file line by line: one line in memory at a time
+        processed_count, error_count = write_productdata_json(
+            txt_file_path, json_file_path, workers=workers
+        )
 
         print(f"✅ ProductData.json generado exitosamente!")
         print(f"📊 Productos procesados: {processed_count}")
@@ -292,7 +289,141 @@ def productdata_txt_to_json(txt_file_path, json_file_path):
         return False
 
 
-def main():
+# Versión de los conversores, registrada en el manifiesto de build
+# Incrementar cuando cambie la salida de cualquier conversión
+CONVERTER_VERSION = "3"
+
+# Conversiones de gamedata: (origen, destino, función)
+CONVERSIONS = (
+    ("figuredata.xml", "FigureData.json", figuredata_xml_to_json),
+    ("furnidata.xml", "FurnitureData.json", furnidata_xml_to_json),
+    ("productdata.txt", "ProductData.json", productdata_txt_to_json),
+)
+
+
+def run_conversion(converter, source_path, output_path, capture_output=False):
+    """
+    Ejecuta una conversión y retorna su resultado, tiempo, error y log
+    """
+    log = io.StringIO()
+    start = time.perf_counter()
+    ok = False
+    error = None
+    try:
+        if capture_output:
+            with contextlib.redirect_stdout(log):
+                ok = converter(source_path, output_path)
+        else:
+            ok = converter(source_path, output_path)
+    except Exception as e:
+        error = str(e)
+
+    return {
+        "ok": bool(ok),
+        "seconds": time.perf_counter() - start,
+        "error": error,
+        "log": log.getvalue(),
+    }
+
+
+def run_conversions(jobs, parallel=False):
+    """
+    Ejecuta las conversiones en orden o todas a la vez en un pool de procesos
+    Los resultados se retornan siempre en el orden de jobs
+    """
+    if not jobs:
+        return []
+
+    if not parallel:
+        results = []
+        for job in jobs:
+            print(f"\n📄 Convirtiendo {job['name']}...")
+            results.append(run_conversion(job["converter"], job["source"], job["output"]))
+        return results
+
+    print(f"\n⚡ Ejecutando {len(jobs)} conversiones en paralelo...")
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [
+            pool.submit(run_conversion, job["converter"], job["source"], job["output"], True)
+            for job in jobs
+        ]
+
+        results = []
+        for job, future in zip(jobs, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"ok": False, "seconds": 0.0, "error": str(e), "log": ""}
+
+            # Mostrar el log de cada conversión completo y en orden
+            print(f"\n📄 Convirtiendo {job['name']}...")
+            print(result["log"], end="")
+            results.append(result)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convierte figuredata.xml, furnidata.xml y productdata.txt a JSON."
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Ejecutar las tres conversiones a la vez en procesos separados.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignorar el manifiesto de build y reconvertir todo.",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=SHARD_MODES,
+        help="Escribir además FurnitureData en shards por rango de id o categoría.",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help=f"Cantidad de ids por shard con --shard-by id (default: {DEFAULT_SHARD_SIZE}).",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Generar .gz y .br junto a cada JSON de gamedata que haya cambiado.",
+    )
+    parser.add_argument(
+        "--hashed-names",
+        action="store_true",
+        help="Publicar además copias con hash en el nombre (FurnitureData.<hash>.json).",
+    )
+    parser.add_argument(
+        "--renderer-config",
+        help="renderer-config.json a reescribir para usar los nombres con hash.",
+    )
+    parser.add_argument(
+        "--keep-generations",
+        type=int,
+        default=DEFAULT_KEEP_GENERATIONS,
+        help=f"Generaciones con hash a conservar por archivo (default: {DEFAULT_KEEP_GENERATIONS}).",
+    )
+    parser.add_argument(
+        "--productdata-workers",
+        type=int,
+        default=1,
+        help="Procesos para decodificar productdata.txt en paralelo (default: 1).",
+    )
+    parser.add_argument(
+        "--repair-workers",
+        type=int,
+        default=1,
+        help="Procesos para reparar furnidata.xml en paralelo si hace falta (default: 1).",
+    )
+    args = parser.parse_args(argv)
+    if args.shard_size < 1:
+        parser.error("--shard-size debe ser al menos 1")
+
     print("🔄 Iniciando conversión de archivos XML/TXT a JSON...")
 
     # Base paths
@@ -303,34 +434,116 @@ def main():
     gamedata_dir = f"{assets_base}/gamedata"
     os.makedirs(gamedata_dir, exist_ok=True)
 
-    success_count = 0
-    total_conversions = 3
-
-    # Convert figuredata.xml to FigureData.json
-    print("\n📄 Convirtiendo figuredata.xml...")
-    if figuredata_xml_to_json(
-        f"{swf_base}/gamedata/figuredata.xml", f"{gamedata_dir}/FigureData.json"
-    ):
-        success_count += 1
-
-    # Convert furnidata.xml to FurnitureData.json
-    print("\n📄 Convirtiendo furnidata.xml...")
-    if furnidata_xml_to_json(
-        f"{swf_base}/gamedata/furnidata.xml", f"{gamedata_dir}/FurnitureData.json"
-    ):
-        success_count += 1
-
-    # Convert productdata.txt to ProductData.json
-    print("\n📄 Convirtiendo productdata.txt...")
-    if productdata_txt_to_json(
-        f"{swf_base}/gamedata/productdata.txt", f"{gamedata_dir}/ProductData.json"
-    ):
-        success_count += 1
+    jobs = []
+    for source_name, output_name, converter in CONVERSIONS:
+        job = {
+            "name": source_name,
+            "source": f"{swf_base}/gamedata/{source_name}",
+            "output": f"{gamedata_dir}/{output_name}",
+            "converter": converter,
+            "version": CONVERTER_VERSION,
+            "sharded": False,
+        }
+        if converter is furnidata_xml_to_json and args.shard_by:
+            job["converter"] = functools.partial(
+                furnidata_xml_to_json,
+                shard_by=args.shard_by,
+                shard_size=args.shard_size,
+            )
+            # Las opciones de shard cambian las salidas, así que son parte
+            # de la versión registrada en el manifiesto
+            job["version"] = f"{CONVERTER_VERSION}+shard-{args.shard_by}-{args.shard_size}"
+            job["sharded"] = True
+        if converter is furnidata_xml_to_json and args.repair_workers > 1:
+            # La reparación en paralelo da el mismo resultado
+            job["converter"] = functools.partial(
+                job["converter"], repair_workers=args.repair_workers
+            )
+        if converter is productdata_txt_to_json and args.productdata_workers > 1:
+            # La salida es la misma, así que la versión no cambia
+            job["converter"] = functools.partial(
+                productdata_txt_to_json, workers=args.productdata_workers
+            )
+        jobs.append(job)
+
+    start = time.perf_counter()
+
+    # Saltar las conversiones cuyas fuentes y versión no cambiaron
+    manifest = BuildManifest(gamedata_dir)
+    results = [None] * len(jobs)
+    pending = []
+    for index, job in enumerate(jobs):
+        if not args.force and manifest.is_fresh(
+            job["output"], [job["source"]], job["version"]
+        ):
+            print(f"\n♻️  {job['name']} sin cambios, usando salida en cache")
+            results[index] = {"ok": True, "seconds": 0.0, "error": None, "cached": True}
+        else:
+            pending.append(index)
+
+    pending_results = run_conversions(
+        [jobs[index] for index in pending], parallel=args.parallel
+    )
+    for index, result in zip(pending, pending_results):
+        results[index] = result
+        job = jobs[index]
+        if result["ok"]:
+            outputs = [job["output"]]
+            if job["sharded"]:
+                outputs += shard_files(furnidata_shard_dir(job["output"]))
+            manifest.record(job["output"], [job["source"]], job["version"], outputs)
+        else:
+            manifest.forget(job["output"])
+    manifest.save()
+
+    if args.precompress:
+        extra_paths = []
+        if args.shard_by:
+            extra_paths = shard_files(furnidata_shard_dir(f"{gamedata_dir}/FurnitureData.json"))
+        print("\n🗜️  Verificando archivos precomprimidos...")
+        try:
+            precompress_files(
+                gamedata_files(gamedata_dir, extra_paths),
+                gamedata_dir,
+                parallel=args.parallel,
+            )
+        except Exception as e:
+            print(f"⚠️  Error al precomprimir gamedata: {e}")
+
+    if args.hashed_names:
+        print("\n🔗 Publicando gamedata con nombres por contenido...")
+        try:
+            mapping = publish_hashed(gamedata_dir)
+            if args.renderer_config:
+                if os.path.exists(args.renderer_config):
+                    rewrite_renderer_config(args.renderer_config, mapping)
+                    print(f"   ✅ {args.renderer_config} actualizado")
+                else:
+                    print(f"   ⚠️  No existe {args.renderer_config}, no se actualizó")
+            removed = collect_generations(gamedata_dir, mapping, args.keep_generations)
+            if removed:
+                print(f"   🧹 {removed} archivos de generaciones antiguas eliminados")
+        except Exception as e:
+            print(f"⚠️  Error al publicar gamedata con hash: {e}")
+
+    elapsed = time.perf_counter() - start
+
+    success_count = sum(1 for result in results if result["ok"])
+    total_conversions = len(jobs)
 
     # Summary
     print(f"\n📊 Resumen de conversiones:")
+    for job, result in zip(jobs, results):
+        if result.get("cached"):
+            print(f"   ♻️  {job['name']}: cache")
+            continue
+        status = "✅" if result["ok"] else "❌"
+        print(f"   {status} {job['name']}: {result['seconds']:.2f}s")
+        if result["error"]:
+            print(f"      ⚠️  {result['error']}")
     print(f"   ✅ Exitosas: {success_count}/{total_conversions}")
     print(f"   ❌ Fallidas: {total_conversions - success_count}/{total_conversions}")
+    print(f"   ⏱️  Tiempo total: {elapsed:.2f}s")
 
     if success_count == total_conversions:
         print("🎉 ¡Todas las conversiones completadas exitosamente!")
@@ -4,6 +4,7 @@ Script principal para convertir todos los archivos XML/TXT a JSON
 Diseñado para ejecutarse dentro del contenedor assets
 """
 
+import io
 import json
 import os
 import sys
@@ -11,6 +12,10 @@ import subprocess
 import xml.etree.ElementTree as ET
 import re
 
+from furnidata_schema import CHILD, ROOM_SECTION, SECTIONS, WALL_SECTION, section_fields
+from furnidata_stream import FurnitypeQuarantine, write_furnidata_json
+from json_stream import FURNITUREDATA_LAYOUT, StreamingJSONWriter
+
 
 def figuredata_xml_to_json(xml_file_path, json_file_path):
     """
@@ -152,136 +157,35 @@ def furnidata_xml_to_json(xml_file_path, json_file_path):
         content = content.replace('___PROTECTED_QUOT___', '&quot;')
         content = content.replace('___PROTECTED_APOS___', '&apos;')
         
-        # Write to temporary file
-        temp_file = xml_file_path + '.temp'
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        # Try to parse with error handling
-        try:
-            tree = ET.parse(temp_file)
-            root = tree.getroot()
-            print("✅ XML parsing exitoso")
-        except ET.ParseError as e:
-            print(f"❌ Error de parsing: {e}")
-            print("🔧 Intentando parsing con estrategia alternativa...")
-            
-            # Try to parse with a more permissive approach
-            try:
-                from xml.etree.ElementTree import XMLParser
-                
-                class PermissiveXMLParser(XMLParser):
-                    def _handle_error(self, error):
-                        # Log the error but continue parsing
-                        print(f"⚠️  Error XML ignorado: {error}")
-                        return True
-                
-                parser = PermissiveXMLParser()
-                tree = ET.parse(temp_file, parser=parser)
-                root = tree.getroot()
-                print("✅ XML parsing exitoso con parser permisivo")
-            except Exception as e2:
-                print(f"❌ Error con parser permisivo: {e2}")
-                # If all else fails, try to extract data manually
-                print("🔧 Intentando extracción manual de datos...")
-                return furnidata_manual_extraction(xml_file_path, json_file_path)
+        # Parse the cleaned content from memory instead of a temporary file
+        cleaned = io.BytesIO(content.encode('utf-8'))
+        del content
         
-        # If we get here, we have a valid XML tree
-        print("📊 Procesando datos XML...")
-
-        # Initialize the result dictionary
-        result = {
-            "roomitemtypes": {"furnitype": []},
-            "wallitemtypes": {"furnitype": []},
-        }
-
-        # Process roomitemtypes
-        roomitemtypes = root.find("roomitemtypes")
-        if roomitemtypes is not None:
-            for furnitype in roomitemtypes.findall("furnitype"):
-                try:
-                    furni_data = {
-                        "id": int(furnitype.get("id", 0)),
-                        "classname": furnitype.get("classname", ""),
-                        "revision": int(furnitype.findtext("revision", 0)),
-                        "category": furnitype.findtext("category", ""),
-                        "defaultdir": int(furnitype.findtext("defaultdir", 0)),
-                        "xdim": int(furnitype.findtext("xdim", 1)),
-                        "ydim": int(furnitype.findtext("ydim", 1)),
-                        "name": furnitype.findtext("name", ""),
-                        "description": furnitype.findtext("description", ""),
-                        "adurl": furnitype.findtext("adurl", ""),
-                        "offerid": int(furnitype.findtext("offerid", -1)),
-                        "buyout": int(furnitype.findtext("buyout", 0)),
-                        "rentofferid": int(furnitype.findtext("rentofferid", -1)),
-                        "rentbuyout": int(furnitype.findtext("rentbuyout", 0)),
-                        "bc": int(furnitype.findtext("bc", 0)),
-                        "excludeddynamic": int(furnitype.findtext("excludeddynamic", 0)),
-                        "customparams": furnitype.findtext("customparams", ""),
-                        "specialtype": int(furnitype.findtext("specialtype", 1)),
-                        "canstandon": int(furnitype.findtext("canstandon", 0)),
-                        "cansiton": int(furnitype.findtext("cansiton", 0)),
-                        "canlayon": int(furnitype.findtext("canlayon", 0)),
-                        "furniline": furnitype.findtext("furniline", ""),
-                        "environment": furnitype.findtext("environment", ""),
-                        "rare": int(furnitype.findtext("rare", 0)),
-                    }
-                    result["roomitemtypes"]["furnitype"].append(furni_data)
-                except Exception as e:
-                    print(f"⚠️  Error procesando room item ID {furnitype.get('id', 'desconocido')}: {e}")
-                    continue
-
-        # Process wallitemtypes
-        wallitemtypes = root.find("wallitemtypes")
-        if wallitemtypes is not None:
-            for furnitype in wallitemtypes.findall("furnitype"):
-                try:
-                    furni_data = {
-                        "id": int(furnitype.get("id", 0)),
-                        "classname": furnitype.get("classname", ""),
-                        "revision": int(furnitype.findtext("revision", 0)),
-                        "category": furnitype.findtext("category", ""),
-                        "name": furnitype.findtext("name", ""),
-                        "description": furnitype.findtext("description", ""),
-                        "adurl": furnitype.findtext("adurl", ""),
-                        "offerid": int(furnitype.findtext("offerid", -1)),
-                        "buyout": int(furnitype.findtext("buyout", 0)),
-                        "rentofferid": int(furnitype.findtext("rentofferid", -1)),
-                        "rentbuyout": int(furnitype.findtext("rentbuyout", 0)),
-                        "bc": int(furnitype.findtext("bc", 0)),
-                        "excludeddynamic": int(furnitype.findtext("excludeddynamic", 0)),
-                        "customparams": furnitype.findtext("customparams", ""),
-                        "specialtype": int(furnitype.findtext("specialtype", 1)),
-                        "furniline": furnitype.findtext("furniline", ""),
-                        "environment": furnitype.findtext("environment", ""),
-                        "rare": int(furnitype.findtext("rare", 0)),
-                    }
-                    result["wallitemtypes"]["furnitype"].append(furni_data)
-                except Exception as e:
-                    print(f"⚠️  Error procesando wall item ID {furnitype.get('id', 'desconocido')}: {e}")
-                    continue
-
-        # Write JSON file
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, separators=(",", ":"))
+        # Parse one furnitype at a time in recovery mode: broken records are
+        # quarantined (offsets refer to the cleaned content) instead of
+        # failing the whole file
+        quarantine_path = xml_file_path + '.quarantine.jsonl'
+        with FurnitypeQuarantine(quarantine_path) as quarantine:
+            room_count, wall_count = write_furnidata_json(
+                cleaned, json_file_path, recover=True, quarantine=quarantine
+            )
+        if quarantine.count:
+            print(f"⚠️  {quarantine.count} furnitypes corruptos en cuarentena: {quarantine_path}")
+
+        if room_count == 0 and wall_count == 0 and quarantine.count == 0:
+            # No furnitype sections could be found, try to extract data manually
+            print("❌ No se encontraron secciones de furnitypes")
+            print("🔧 Intentando extracción manual de datos...")
+            return furnidata_manual_extraction(xml_file_path, json_file_path)
+        print("✅ XML parsing exitoso")
 
         print(f"✅ FurnitureData.json generado exitosamente!")
-        print(f"📊 Elementos procesados: {len(result['roomitemtypes']['furnitype'])} room items, {len(result['wallitemtypes']['furnitype'])} wall items")
-        
-        # Clean up temporary file
-        import os
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+        print(f"📊 Elementos procesados: {room_count} room items, {wall_count} wall items")
         
         return True
 
     except Exception as e:
         print(f"❌ Error al convertir furnidata.xml: {e}")
-        # Clean up temporary file on error
-        import os
-        temp_file = xml_file_path + '.temp'
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
         return False
 
 
@@ -352,6 +256,35 @@ def productdata_txt_to_json(txt_file_path, json_file_path):
         return False
 
 
+# Patrones de la extracción manual, compilados una sola vez
+SECTION_PATTERNS = {
+    section: re.compile(f'<{section}>(.*?)</{section}>', re.DOTALL)
+    for section in SECTIONS
+}
+FURNITYPE_PATTERN = re.compile(
+    r'<furnitype[^>]*id="(\d+)"[^>]*classname="([^"]*)"[^>]*>(.*?)</furnitype>',
+    re.DOTALL,
+)
+
+# Por sección: plantilla con los defaults en orden de salida y, para cada
+# campo que viene de un hijo, su cierre con la coerción (tipo, default)
+_MANUAL_TEMPLATES = {
+    section: {field.name: field.default for field in section_fields(section)}
+    for section in SECTIONS
+}
+_MANUAL_FIELDS = {
+    section: {
+        field.name: (f'</{field.name}>', field.type, field.default)
+        for field in section_fields(section)
+        if field.source == CHILD
+    }
+    for section in SECTIONS
+}
+# Aperturas de todos los hijos en una sola pasada; un grupo con un
+# patrón por campo resulta más lento que buscar cualquier tag y filtrar
+CHILD_OPENING_PATTERN = re.compile(r'<(?P<tag>\w+)>')
+
+
 def furnidata_manual_extraction(xml_file_path, json_file_path):
     """
     Extrae datos manualmente del XML cuando el parser falla
@@ -362,102 +295,29 @@ def furnidata_manual_extraction(xml_file_path, json_file_path):
         with open(xml_file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
         
-        # Initialize result
-        result = {
-            "roomitemtypes": {"furnitype": []},
-            "wallitemtypes": {"furnitype": []},
-        }
-        
-        # Use regex to extract furnitype blocks
-        import re
-        
-        # Find roomitemtypes section
-        roomitem_pattern = r'<roomitemtypes>(.*?)</roomitemtypes>'
-        roomitem_match = re.search(roomitem_pattern, content, re.DOTALL)
-        
-        if roomitem_match:
-            roomitem_content = roomitem_match.group(1)
-            # Extract individual furnitype entries
-            furnitype_pattern = r'<furnitype[^>]*id="(\d+)"[^>]*classname="([^"]*)"[^>]*>(.*?)</furnitype>'
-            
-            for match in re.finditer(furnitype_pattern, roomitem_content, re.DOTALL):
-                furni_id = int(match.group(1))
-                classname = match.group(2)
-                furni_content = match.group(3)
-                
-                # Extract basic fields
-                furni_data = {
-                    "id": furni_id,
-                    "classname": classname,
-                    "revision": extract_field(furni_content, "revision", 0),
-                    "category": extract_field(furni_content, "category", ""),
-                    "defaultdir": extract_field(furni_content, "defaultdir", 0),
-                    "xdim": extract_field(furni_content, "xdim", 1),
-                    "ydim": extract_field(furni_content, "ydim", 1),
-                    "name": extract_field(furni_content, "name", ""),
-                    "description": extract_field(furni_content, "description", ""),
-                    "adurl": extract_field(furni_content, "adurl", ""),
-                    "offerid": extract_field(furni_content, "offerid", -1),
-                    "buyout": extract_field(furni_content, "buyout", 0),
-                    "rentofferid": extract_field(furni_content, "rentofferid", -1),
-                    "rentbuyout": extract_field(furni_content, "rentbuyout", 0),
-                    "bc": extract_field(furni_content, "bc", 0),
-                    "excludeddynamic": extract_field(furni_content, "excludeddynamic", 0),
-                    "customparams": extract_field(furni_content, "customparams", ""),
-                    "specialtype": extract_field(furni_content, "specialtype", 1),
-                    "canstandon": extract_field(furni_content, "canstandon", 0),
-                    "cansiton": extract_field(furni_content, "cansiton", 0),
-                    "canlayon": extract_field(furni_content, "canlayon", 0),
-                    "furniline": extract_field(furni_content, "furniline", ""),
-                    "environment": extract_field(furni_content, "environment", ""),
-                    "rare": extract_field(furni_content, "rare", 0),
-                }
-                
-                result["roomitemtypes"]["furnitype"].append(furni_data)
-        
-        # Find wallitemtypes section  
-        wallitem_pattern = r'<wallitemtypes>(.*?)</wallitemtypes>'
-        wallitem_match = re.search(wallitem_pattern, content, re.DOTALL)
+        counts = {ROOM_SECTION: 0, WALL_SECTION: 0}
         
-        if wallitem_match:
-            wallitem_content = wallitem_match.group(1)
-            # Extract individual furnitype entries
-            furnitype_pattern = r'<furnitype[^>]*id="(\d+)"[^>]*classname="([^"]*)"[^>]*>(.*?)</furnitype>'
-            
-            for match in re.finditer(furnitype_pattern, wallitem_content, re.DOTALL):
-                furni_id = int(match.group(1))
-                classname = match.group(2)
-                furni_content = match.group(3)
+        # Write each furnitype as soon as it is extracted, room items first
+        with StreamingJSONWriter(json_file_path, FURNITUREDATA_LAYOUT) as writer:
+            for index, section in enumerate(SECTIONS):
+                if index:
+                    writer.next_array()
                 
-                furni_data = {
-                    "id": furni_id,
-                    "classname": classname,
-                    "revision": extract_field(furni_content, "revision", 0),
-                    "category": extract_field(furni_content, "category", ""),
-                    "name": extract_field(furni_content, "name", ""),
-                    "description": extract_field(furni_content, "description", ""),
-                    "adurl": extract_field(furni_content, "adurl", ""),
-                    "offerid": extract_field(furni_content, "offerid", -1),
-                    "buyout": extract_field(furni_content, "buyout", 0),
-                    "rentofferid": extract_field(furni_content, "rentofferid", -1),
-                    "rentbuyout": extract_field(furni_content, "rentbuyout", 0),
-                    "bc": extract_field(furni_content, "bc", 0),
-                    "excludeddynamic": extract_field(furni_content, "excludeddynamic", 0),
-                    "customparams": extract_field(furni_content, "customparams", ""),
-                    "specialtype": extract_field(furni_content, "specialtype", 1),
-                    "furniline": extract_field(furni_content, "furniline", ""),
-                    "environment": extract_field(furni_content, "environment", ""),
-                    "rare": extract_field(furni_content, "rare", 0),
-                }
+                section_match = SECTION_PATTERNS[section].search(content)
+                if not section_match:
+                    continue
                 
-                result["wallitemtypes"]["furnitype"].append(furni_data)
-        
-        # Write JSON file
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, separators=(",", ":"))
+                # Extract individual furnitype entries without copying the section
+                for match in FURNITYPE_PATTERN.finditer(
+                    content, section_match.start(1), section_match.end(1)
+                ):
+                    writer.write(extract_furnitype_fields(
+                        int(match.group(1)), match.group(2), match.group(3), section
+                    ))
+                    counts[section] += 1
         
         print(f"✅ FurnitureData.json generado exitosamente (extracción manual)!")
-        print(f"📊 Elementos procesados: {len(result['roomitemtypes']['furnitype'])} room items, {len(result['wallitemtypes']['furnitype'])} wall items")
+        print(f"📊 Elementos procesados: {counts[ROOM_SECTION]} room items, {counts[WALL_SECTION]} wall items")
         
         return True
         
@@ -465,28 +325,37 @@ def furnidata_manual_extraction(xml_file_path, json_file_path):
         print(f"❌ Error en extracción manual: {e}")
         return False
 
-def extract_field(content, field_name, default_value):
+def extract_furnitype_fields(furni_id, classname, content, section):
     """
-    Extrae un campo específico del contenido XML
+    Extrae todos los campos de un furnitype según el esquema compartido
+    De cada campo se toma el primer <campo>...</campo>, sin espacios
+    alrededor; si no está o no se puede convertir a su tipo queda el default
     """
-    import re
-    
-    # Try to find the field
-    pattern = f'<{field_name}>(.*?)</{field_name}>'
-    match = re.search(pattern, content, re.DOTALL)
+    furni_data = _MANUAL_TEMPLATES[section].copy()
+    furni_data["id"] = furni_id
+    furni_data["classname"] = classname
     
-    if match:
-        value = match.group(1).strip()
-        # Convert to appropriate type
-        if isinstance(default_value, int):
-            try:
-                return int(value)
-            except:
-                return default_value
-        else:
-            return value
-    
-    return default_value
+    fields = _MANUAL_FIELDS[section]
+    # Fin de la primera apertura de cada campo; las aperturas no se
+    # superponen, así que una pasada encuentra la primera de cada uno
+    openings = {}
+    for match in CHILD_OPENING_PATTERN.finditer(content):
+        openings.setdefault(match['tag'], match.end())
+
+    # Valor hasta el primer cierre posterior: si la primera apertura no
+    # tiene cierre, ninguna de las siguientes lo tiene
+    for tag, (closing_tag, coerce, default_value) in fields.items():
+        start = openings.get(tag)
+        if start is None:
+            continue
+        end = content.find(closing_tag, start)
+        if end == -1:
+            continue
+        try:
+            furni_data[tag] = coerce(content[start:end].strip())
+        except ValueError:
+            furni_data[tag] = default_value
+    return furni_data
 
 
 def main():
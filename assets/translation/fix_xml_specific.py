@@ -3,167 +3,122 @@
 Script para corregir errores específicos en furnidata.xml
 """
 
+import argparse
+import os
+import shutil
 import sys
-import re
 
-def fix_specific_xml_errors(file_path):
+from build_manifest import file_sha256
+from xml_check import is_well_formed
+from xml_patch import CachedRepairStream, RepairPatchCache
+
+def fix_specific_xml_errors(
+    file_path, backup=False, force=False, workers=1, report_path=None, verbose=False
+):
     """
     Corrige errores específicos conocidos en el XML
+    Si el XML ya está bien formado no se modifica, salvo con force=True
+    Las correcciones se guardan como parche por hash del archivo, así que
+    reparar de nuevo el mismo original solo aplica el parche
+    Con workers > 1 la reparación se reparte en un pool de procesos
+    Con backup=True guarda una copia del original en <archivo>.backup2
+    El detalle de las correcciones (cantidad por categoría y una muestra
+    con offsets) se escribe como JSON en report_path, por defecto
+    <archivo>.repair-report.json; con verbose=True además se emite cada
+    corrección por stderr, una por línea
     """
     print(f"🔧 Corrigiendo errores específicos en {file_path}...")
     
-    # Leer el archivo
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Crear backup
-    with open(file_path + '.backup2', 'w', encoding='utf-8') as f:
-        f.write(content)
-    print(f"💾 Backup creado: {file_path}.backup2")
-    
-    # Contadores de correcciones
-    corrections = 0
-    
-    # 1. Corregir el error específico en customparams
-    # Patrón: <customparams>...="value</customparams>
-    # Corrección: <customparams>...="value"</customparams>
-    
-    # Buscar patrones problemáticos
-    pattern1 = r'<customparams>([^<]*="[^"]*)</customparams>'
-    matches = re.findall(pattern1, content)
-    
-    if matches:
-        print(f"🔍 Encontrados {len(matches)} patrones problemáticos en customparams")
-        for match in matches:
-            print(f"   - {match}")
-        
-        # Corregir cada match
-        def fix_customparams(match):
-            inner_content = match.group(1)
-            # Si termina con una comilla sin cerrar, agregar la comilla de cierre
-            if inner_content.count('"') % 2 == 1:  # número impar de comillas
-                fixed_content = inner_content + '"'
-                return f'<customparams>{fixed_content}</customparams>'
-            return match.group(0)
-        
-        content = re.sub(pattern1, fix_customparams, content)
-        corrections += len(matches)
-    
-    # 2. Corregir comillas mal cerradas en general
-    # Buscar patrones como ="value sin comilla de cierre
-    pattern2 = r'="([^"]*)</([^>]+)>'
-    matches2 = re.findall(pattern2, content)
-    
-    if matches2:
-        print(f"🔍 Encontrados {len(matches2)} patrones de comillas mal cerradas")
-        for match in matches2:
-            print(f"   - Value: {match[0]}, Tag: {match[1]}")
-        
-        # Corregir comillas mal cerradas
-        def fix_quotes(match):
-            value = match.group(1)
-            tag = match.group(2)
-            return f'="{value}"></{tag}>'
-        
-        content = re.sub(pattern2, fix_quotes, content)
-        corrections += len(matches2)
-    
-    # 3. Corregir caracteres especiales problemáticos
-    # Buscar caracteres que no sean XML válidos
-    invalid_chars = re.findall(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', content)
-    if invalid_chars:
-        print(f"🔍 Encontrados {len(invalid_chars)} caracteres inválidos")
-        content = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', content)
-        corrections += len(invalid_chars)
-    
-    # 4. Corregir entidades XML malformadas
-    # Escapar & que no son parte de entidades válidas
-    def fix_ampersands(match):
-        char = match.group(0)
-        # Solo reemplazar si no es parte de una entidad válida
-        return '&amp;'
-    
-    # Primero proteger las entidades válidas
-    content = content.replace('&amp;', '___TEMP_AMP___')
-    content = content.replace('&lt;', '___TEMP_LT___')
-    content = content.replace('&gt;', '___TEMP_GT___')
-    content = content.replace('&quot;', '___TEMP_QUOT___')
-    content = content.replace('&apos;', '___TEMP_APOS___')
-    
-    # Escapar & restantes
-    amp_count = content.count('&')
-    content = content.replace('&', '&amp;')
-    if amp_count > 0:
-        corrections += amp_count
-        print(f"🔍 Escapados {amp_count} caracteres &")
-    
-    # Restaurar entidades protegidas
-    content = content.replace('___TEMP_AMP___', '&amp;')
-    content = content.replace('___TEMP_LT___', '&lt;')
-    content = content.replace('___TEMP_GT___', '&gt;')
-    content = content.replace('___TEMP_QUOT___', '&quot;')
-    content = content.replace('___TEMP_APOS___', '&apos;')
-    
-    # 5. Corregir tags de cierre con comillas y > extra
-    # Patrón: </tag"> donde debería ser </tag>
-    pattern3 = r'</([^>]+)"\s*>\s*"?\s*>'
-    matches3 = re.findall(pattern3, content)
-    
-    if matches3:
-        print(f"🔍 Encontrados {len(matches3)} tags de cierre con comillas extra")
-        for match in matches3:
-            print(f"   - Tag: {match}")
-        
-        # Corregir tags de cierre malformados
-        def fix_closing_tags(match):
-            tag = match.group(1)
-            return f'</{tag}>'
-        
-        content = re.sub(pattern3, fix_closing_tags, content)
-        corrections += len(matches3)
-    
-    # 6. Corregir patrón específico: </customparams">
-    pattern4 = r'</customparams"\s*>\s*"?\s*>'
-    matches4 = re.findall(pattern4, content)
-    
-    if matches4:
-        print(f"🔍 Encontrados {len(matches4)} patrones específicos de customparams malformados")
-        content = re.sub(pattern4, '</customparams>', content)
-        corrections += len(matches4)
-    
-    # 7. Corregir cualquier tag de cierre que tenga comillas extra
-    pattern5 = r'</([^>]+)"\s*>'
-    matches5 = re.findall(pattern5, content)
-    
-    if matches5:
-        print(f"🔍 Encontrados {len(matches5)} tags de cierre con comillas")
-        for match in matches5:
-            print(f"   - Tag: {match}")
-        
-        def fix_closing_tags_simple(match):
-            tag = match.group(1)
-            return f'</{tag}>'
-        
-        content = re.sub(pattern5, fix_closing_tags_simple, content)
-        corrections += len(matches5)
+    # Verificar primero: un XML bien formado no necesita reparación
+    digest = file_sha256(file_path)
+    if not force and is_well_formed(file_path, digest=digest):
+        print(f"✅ XML bien formado, no se modifica: {file_path}")
+        return False
+    
+    # Crear backup (opcional)
+    if backup:
+        shutil.copyfile(file_path, file_path + '.backup2')
+        print(f"💾 Backup creado: {file_path}.backup2")
+    
+    # Aplicar todas las correcciones en una sola pasada mientras se lee el
+    # original (o el parche guardado para este mismo archivo), escribiendo
+    # directamente a un archivo temporal
+    patches = RepairPatchCache(os.path.dirname(os.path.abspath(file_path)))
+    tmp_path = file_path + '.tmp'
+    try:
+        with CachedRepairStream(
+            file_path, digest, patches, workers, verbose=sys.stderr if verbose else None
+        ) as repaired:
+            if repaired.from_patch:
+                print("♻️  Aplicando parche de reparación guardado")
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(repaired, f)
+            report = repaired.report
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-    # Escribir archivo corregido
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    report.print_summary()
+    corrections = report.total
     
+    if report_path is None:
+        report_path = file_path + '.repair-report.json'
+    report.write_json(report_path)
+    print(f"📄 Reporte de correcciones: {report_path}")
+
     print(f"✅ Correcciones aplicadas: {corrections}")
     print(f"✅ Archivo corregido: {file_path}")
     
     return corrections > 0
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python3 fix_xml_specific.py <archivo.xml>")
-        sys.exit(1)
-    
-    file_path = sys.argv[1]
-    
-    if fix_specific_xml_errors(file_path):
+    parser = argparse.ArgumentParser(
+        description="Corrige errores específicos conocidos en furnidata.xml."
+    )
+    parser.add_argument("file_path", metavar="archivo.xml")
+    parser.add_argument(
+        "--backup",
+        action="store_true",
+        help="Guardar una copia del original en <archivo>.backup2.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reparar aunque el XML ya esté bien formado.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para reparar el archivo en paralelo (default: 1).",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="REPORTE.json",
+        help=(
+            "Ruta del reporte JSON de correcciones "
+            "(default: <archivo>.repair-report.json)."
+        ),
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help=(
+            "Emitir cada corrección por stderr "
+            "(desactiva el parche guardado y el modo paralelo)."
+        ),
+    )
+    args = parser.parse_args()
+    
+    if fix_specific_xml_errors(
+        args.file_path,
+        backup=args.backup,
+        force=args.force,
+        workers=args.workers,
+        report_path=args.report,
+        verbose=args.verbose,
+    ):
         print("🎉 Correcciones aplicadas exitosamente!")
     else:
         print("ℹ️  No se encontraron errores para corregir")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Esquema declarativo de los campos de un <furnitype> de furnidata.xml
+Define nombre, tipo, valor por defecto y a qué sección aplica cada campo,
+y convierte cada furnitype recorriendo sus hijos una sola vez
+"""
+
+from collections import namedtuple
+
+ROOM_SECTION = "roomitemtypes"
+WALL_SECTION = "wallitemtypes"
+SECTIONS = (ROOM_SECTION, WALL_SECTION)
+
+# A qué secciones aplica cada campo
+ROOM_ONLY = (ROOM_SECTION,)
+WALL_ONLY = (WALL_SECTION,)
+BOTH = SECTIONS
+
+# Origen del valor dentro del <furnitype>
+ATTRIBUTE = "attribute"
+CHILD = "child"
+
+FurniField = namedtuple("FurniField", "name type default applies_to source")
+
+# El orden define el orden de las claves en FurnitureData.json
+FURNITYPE_FIELDS = (
+    FurniField("id", int, 0, BOTH, ATTRIBUTE),
+    FurniField("classname", str, "", BOTH, ATTRIBUTE),
+    FurniField("revision", int, 0, BOTH, CHILD),
+    FurniField("category", str, "", BOTH, CHILD),
+    FurniField("defaultdir", int, 0, ROOM_ONLY, CHILD),
+    FurniField("xdim", int, 1, ROOM_ONLY, CHILD),
+    FurniField("ydim", int, 1, ROOM_ONLY, CHILD),
+    FurniField("name", str, "", BOTH, CHILD),
+    FurniField("description", str, "", BOTH, CHILD),
+    FurniField("adurl", str, "", BOTH, CHILD),
+    FurniField("offerid", int, -1, BOTH, CHILD),
+    FurniField("buyout", int, 0, BOTH, CHILD),
+    FurniField("rentofferid", int, -1, BOTH, CHILD),
+    FurniField("rentbuyout", int, 0, BOTH, CHILD),
+    FurniField("bc", int, 0, BOTH, CHILD),
+    FurniField("excludeddynamic", int, 0, BOTH, CHILD),
+    FurniField("customparams", str, "", BOTH, CHILD),
+    FurniField("specialtype", int, 1, BOTH, CHILD),
+    FurniField("canstandon", int, 0, ROOM_ONLY, CHILD),
+    FurniField("cansiton", int, 0, ROOM_ONLY, CHILD),
+    FurniField("canlayon", int, 0, ROOM_ONLY, CHILD),
+    FurniField("furniline", str, "", BOTH, CHILD),
+    FurniField("environment", str, "", BOTH, CHILD),
+    FurniField("rare", int, 0, BOTH, CHILD),
+)
+
+
+def section_fields(section):
+    """
+    Retorna los campos que aplican a una sección, en orden de salida
+    """
+    return tuple(field for field in FURNITYPE_FIELDS if section in field.applies_to)
+
+
+# Planes precalculados por sección:
+# - plantilla con los defaults en orden de salida
+# - coerciones de los campos que vienen de hijos, indexadas por tag
+# - campos que vienen de atributos del <furnitype>
+_TEMPLATES = {
+    section: {field.name: field.default for field in section_fields(section)}
+    for section in SECTIONS
+}
+_CHILD_COERCERS = {
+    section: {
+        field.name: field.type
+        for field in section_fields(section)
+        if field.source == CHILD
+    }
+    for section in SECTIONS
+}
+_ATTRIBUTE_COERCERS = {
+    section: tuple(
+        (field.name, field.type)
+        for field in section_fields(section)
+        if field.source == ATTRIBUTE
+    )
+    for section in SECTIONS
+}
+
+
+def furnitype_to_dict(furnitype, section):
+    """
+    Convierte un elemento <furnitype> a diccionario en una sola pasada
+
+    Equivalente a llamar findtext() por cada campo: se toma el texto del
+    primer hijo con ese tag ("" si está vacío) o el default si no existe.
+    """
+    record = _TEMPLATES[section].copy()
+
+    # Cada coerción se consume con el primer hijo de su tag
+    take_coercer = _CHILD_COERCERS[section].copy().pop
+    for child in furnitype:
+        coerce = take_coercer(child.tag, None)
+        if coerce is not None:
+            record[child.tag] = coerce(child.text or "")
+
+    get_attribute = furnitype.attrib.get
+    for name, coerce in _ATTRIBUTE_COERCERS[section]:
+        raw = get_attribute(name)
+        if raw is not None:
+            record[name] = coerce(raw)
+
+    return record
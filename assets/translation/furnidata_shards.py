@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Salida fragmentada (shards) de FurnitureData.json
+Reparte los furnitypes en archivos por rango de id o por categoría y
+genera un índice que mapea id y classname a su shard, para que los
+clientes descarguen solo los shards que necesitan
+"""
+
+import json
+import os
+import re
+import shutil
+from collections import OrderedDict
+
+from furnidata_schema import ROOM_SECTION, SECTIONS, WALL_SECTION
+from json_stream import FURNITUREDATA_LAYOUT, StreamingJSONWriter
+
+SHARD_DIR_NAME = "furnidata"
+INDEX_NAME = "index.json"
+INDEX_FORMAT = 1
+
+SHARD_MODES = ("id", "category")
+DEFAULT_SHARD_SIZE = 1000
+# Shards con el archivo abierto a la vez; los demás se suspenden
+MAX_OPEN_SHARDS = 64
+
+SECTION_PREFIXES = {ROOM_SECTION: "room", WALL_SECTION: "wall"}
+
+
+def shard_key(section, record, shard_by, shard_size):
+    """
+    Calcula el nombre del shard de un registro
+    """
+    prefix = SECTION_PREFIXES[section]
+    if shard_by == "id":
+        return f"{prefix}-{record['id'] // shard_size}"
+
+    category = re.sub(r"[^A-Za-z0-9_-]", "_", record["category"]) or "none"
+    return f"{prefix}-{category}"
+
+
+def shard_files(shard_dir):
+    """
+    Lista los archivos de un directorio de shards, índice incluido
+    """
+    if not os.path.isdir(shard_dir):
+        return []
+    return sorted(
+        os.path.join(shard_dir, name)
+        for name in os.listdir(shard_dir)
+        if name.endswith(".json")
+    )
+
+
+class FurnitureShardWriter:
+    """
+    Recibe registros de furnidata y los escribe en shards con el mismo
+    formato que FurnitureData.json
+
+    Los shards se construyen en un directorio temporal que reemplaza al
+    anterior solo si la conversión termina sin errores. Solo max_open
+    shards tienen su archivo abierto; al abrir otro se suspende el usado
+    hace más tiempo.
+    """
+
+    def __init__(self, shard_dir, shard_by="id", shard_size=DEFAULT_SHARD_SIZE,
+                 max_open=MAX_OPEN_SHARDS):
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"Modo de shard desconocido: {shard_by}")
+        if shard_by == "id" and shard_size < 1:
+            raise ValueError(f"Tamaño de shard inválido: {shard_size}")
+
+        self.shard_dir = shard_dir
+        self.tmp_dir = shard_dir + ".tmp"
+        self.shard_by = shard_by
+        self.shard_size = shard_size
+        self.max_open = max(max_open, 1)
+        self.writers = {}
+        # Shards con el archivo abierto, del menos al más recientemente usado
+        self.open_keys = OrderedDict()
+        self.shards = {}
+        self.lookup = {section: {"ids": {}, "classnames": {}} for section in SECTIONS}
+
+    def __enter__(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            # Se cierran todos aunque alguno falle; los que siguen a un
+            # error se cierran como fallidos y descartan su temporal
+            error = None
+            for writer in self.writers.values():
+                try:
+                    writer.__exit__(exc_type, exc, traceback)
+                except Exception as e:
+                    if error is None:
+                        error = e
+                        exc_type, exc, traceback = type(e), e, e.__traceback__
+            if error is not None:
+                raise error
+
+            if exc_type is None:
+                self._write_index()
+                shutil.rmtree(self.shard_dir, ignore_errors=True)
+                os.replace(self.tmp_dir, self.shard_dir)
+        finally:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        return False
+
+    def _writer_for(self, section, key):
+        writer = self.writers.get(key)
+        if writer is None:
+            file_name = f"{key}.json"
+            writer = StreamingJSONWriter(
+                os.path.join(self.tmp_dir, file_name), FURNITUREDATA_LAYOUT
+            ).__enter__()
+            # Los shards de wall items dejan vacío el array de room items
+            if section == WALL_SECTION:
+                writer.next_array()
+            self.writers[key] = writer
+            self.shards[key] = {"file": file_name, "section": section, "count": 0}
+
+        self.open_keys[key] = None
+        self.open_keys.move_to_end(key)
+        if len(self.open_keys) > self.max_open:
+            oldest, _ = self.open_keys.popitem(last=False)
+            self.writers[oldest].suspend()
+        return writer
+
+    def add(self, section, record):
+        """
+        Agrega un registro a su shard y al índice
+        """
+        key = shard_key(section, record, self.shard_by, self.shard_size)
+        self._writer_for(section, key).write(record)
+        self.shards[key]["count"] += 1
+
+        lookup = self.lookup[section]
+        lookup["ids"][str(record["id"])] = key
+        lookup["classnames"][record["classname"]] = key
+
+    def _write_index(self):
+        index = {
+            "format": INDEX_FORMAT,
+            "shard_by": self.shard_by,
+            "shard_size": self.shard_size if self.shard_by == "id" else None,
+            "shards": self.shards,
+        }
+        index.update(self.lookup)
+
+        with open(os.path.join(self.tmp_dir, INDEX_NAME), "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"), sort_keys=True)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Conversión en streaming de furnidata.xml a FurnitureData.json
+Procesa un <furnitype> a la vez con iterparse y escribe cada registro
+apenas se completa, manteniendo la memoria constante
+
+En modo recuperación cada <furnitype> se parsea por separado: los
+registros válidos se convierten y los corruptos se guardan en un archivo
+de cuarentena con su offset, sin detener la conversión.
+"""
+
+import json
+import os
+import re
+import tempfile
+import xml.etree.ElementTree as ET
+
+from furnidata_schema import ROOM_SECTION, SECTIONS, WALL_SECTION, furnitype_to_dict
+from json_stream import FURNITUREDATA_LAYOUT, StreamingJSONWriter, encode_record
+
+
+def iter_furnitypes(xml_source):
+    """
+    Recorre furnidata.xml de forma incremental
+
+    Produce (sección, furnitype) por cada <furnitype> hijo directo de la
+    primera <roomitemtypes> / <wallitemtypes> bajo la raíz (igual que
+    root.find), y (sección, None) cuando esa sección se cierra. Cada
+    elemento se libera después de ser consumido.
+    """
+    stack = []
+    seen_sections = set()
+    active_section = None
+
+    for event, elem in ET.iterparse(xml_source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if (
+                len(stack) == 2
+                and elem.tag in SECTIONS
+                and elem.tag not in seen_sections
+            ):
+                active_section = elem.tag
+                seen_sections.add(elem.tag)
+            continue
+
+        stack.pop()
+        depth = len(stack) + 1
+
+        if depth == 3:
+            if active_section is not None and elem.tag == "furnitype":
+                yield active_section, elem
+            # Liberar el elemento ya procesado
+            stack[-1].remove(elem)
+        elif depth == 2:
+            if active_section is not None and elem.tag == active_section:
+                yield active_section, None
+                active_section = None
+            stack[-1].remove(elem)
+
+
+# Tags que delimitan registros y secciones en modo recuperación
+RECOVERY_TOKENS = re.compile(rb"<(/?)(furnitype|roomitemtypes|wallitemtypes)(?=[\s/>])")
+# Largo máximo de un token más el carácter que lo sigue
+RECOVERY_TOKEN_LENGTH = len("</roomitemtypes") + 1
+RECOVERY_READ_SIZE = 1024 * 1024
+
+
+class FurnitypeQuarantine:
+    """
+    Registros descartados en modo recuperación, escritos como un objeto
+    JSON por línea (sección, offset, largo, id, error y el XML del registro)
+
+    source_offset, si se indica, traduce offsets del XML leído a offsets
+    del archivo original (por ejemplo cuando se lee un XML reparado).
+    Al cerrar sin registros se elimina la cuarentena de una corrida anterior.
+    """
+
+    def __init__(self, path, source_offset=None):
+        self.path = path
+        self.source_offset = source_offset
+        self.count = 0
+        self.file = None
+
+    def add(self, section, offset, data, error):
+        if self.file is None:
+            self.file = open(self.path + ".tmp", "w", encoding="utf-8")
+        if self.source_offset is not None:
+            offset = self.source_offset(offset)
+
+        record = data.decode("utf-8", errors="replace")
+        match = re.search(r'\bid="([^"]*)"', record)
+        entry = {
+            "section": section,
+            "offset": offset,
+            "length": len(data),
+            "id": match.group(1) if match else None,
+            "error": str(error),
+            "record": record,
+        }
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.replace(self.path + ".tmp", self.path)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FurnitypeRecoveryParser:
+    """
+    Recorre furnidata.xml en una sola pasada lineal parseando cada
+    <furnitype> por separado, de modo que un registro corrupto no
+    detiene al resto
+
+    Produce lo mismo que iter_furnitypes: (sección, furnitype) por cada
+    registro válido dentro de la primera <roomitemtypes> / <wallitemtypes>
+    y (sección, None) al cerrarse la sección (o al final del archivo si
+    nunca se cierra). Los registros que no se pueden parsear, o que quedan
+    sin cerrar, van a quarantine. current es (offset, bytes) del último
+    registro producido.
+    """
+
+    def __init__(self, xml_source, quarantine=None):
+        self.xml_source = xml_source
+        self.quarantine = quarantine
+        self.current = None
+        self.sections_found = 0
+
+    def _reject(self, section, offset, data, error):
+        if self.quarantine is not None:
+            self.quarantine.add(section, offset, data, error)
+
+    def __iter__(self):
+        if isinstance(self.xml_source, (str, bytes, os.PathLike)):
+            with open(self.xml_source, "rb") as f:
+                yield from self._iter_records(f)
+        else:
+            yield from self._iter_records(self.xml_source)
+
+    def _iter_records(self, source):
+        buffer = b""
+        base = 0  # offset de buffer[0] en el archivo
+        pos = 0
+        eof = False
+        seen_sections = set()
+        active_section = None
+        record_start = None
+
+        while True:
+            match = RECOVERY_TOKENS.search(buffer, pos)
+            # Un token cerca del final puede estar incompleto, y sin su >
+            # todavía no se sabe dónde termina
+            keep = max(pos, len(buffer) - RECOVERY_TOKEN_LENGTH)
+            tag_end = -1
+            if match is not None and not eof:
+                if match.start() > len(buffer) - RECOVERY_TOKEN_LENGTH:
+                    match = None
+                else:
+                    tag_end = buffer.find(b">", match.end())
+                    if tag_end == -1:
+                        keep = match.start()
+                        match = None
+            elif match is not None:
+                tag_end = buffer.find(b">", match.end())
+
+            if match is None:
+                if eof:
+                    break
+                # Conservar el registro en curso y el final sin revisar
+                if record_start is not None:
+                    keep = min(keep, record_start - base)
+                data = source.read(RECOVERY_READ_SIZE)
+                eof = not data
+                buffer = buffer[keep:] + data
+                base += keep
+                pos -= keep
+                continue
+
+            closing, name = match.group(1), match.group(2).decode("ascii")
+            start = match.start()
+            pos = match.end()
+
+            if name == "furnitype":
+                if active_section is None:
+                    continue
+                if not closing:
+                    if record_start is not None:
+                        self._reject(
+                            active_section,
+                            record_start,
+                            buffer[record_start - base : start],
+                            "furnitype sin cerrar",
+                        )
+                    record_start = base + start
+                    continue
+                if record_start is None or tag_end == -1:
+                    continue
+
+                end = tag_end + 1
+                data = buffer[record_start - base : end]
+                offset = record_start
+                record_start = None
+                pos = end
+                try:
+                    furnitype = ET.fromstring(data)
+                except ET.ParseError as e:
+                    self._reject(active_section, offset, data, e)
+                    continue
+                self.current = (offset, data)
+                yield active_section, furnitype
+                continue
+
+            # Tag de sección: un registro abierto ya no puede cerrarse
+            if record_start is not None:
+                self._reject(
+                    active_section,
+                    record_start,
+                    buffer[record_start - base : start],
+                    "furnitype sin cerrar",
+                )
+                record_start = None
+
+            self_closing = tag_end != -1 and buffer[tag_end - 1 : tag_end] == b"/"
+            if closing:
+                if name == active_section:
+                    yield active_section, None
+                    active_section = None
+            elif name not in seen_sections:
+                seen_sections.add(name)
+                self.sections_found += 1
+                if self_closing:
+                    yield name, None
+                else:
+                    active_section = name
+
+        if record_start is not None:
+            self._reject(
+                active_section,
+                record_start,
+                buffer[record_start - base :],
+                "furnitype sin cerrar",
+            )
+        if active_section is not None:
+            yield active_section, None
+
+
+def write_furnidata_json(
+    xml_source,
+    json_file_path,
+    skip_invalid=False,
+    on_record=None,
+    recover=False,
+    quarantine=None,
+):
+    """
+    Convierte furnidata.xml a FurnitureData.json en streaming
+
+    La salida es idéntica byte a byte a json.dump(result, separators=(",", ":")).
+    on_record(sección, registro) se llama por cada registro convertido, por
+    ejemplo para escribir salidas adicionales en la misma pasada.
+    Con recover=True usa FurnitypeRecoveryParser: los registros que no se
+    pueden parsear o convertir van a quarantine en lugar de abortar.
+    Retorna (room_items, wall_items).
+    """
+    counts = {ROOM_SECTION: 0, WALL_SECTION: 0}
+    room_closed = False
+    if recover:
+        records = FurnitypeRecoveryParser(xml_source, quarantine)
+    else:
+        records = iter_furnitypes(xml_source)
+
+    with StreamingJSONWriter(
+        json_file_path, FURNITUREDATA_LAYOUT
+    ) as writer, tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        # Los wall items que aparezcan antes que los room items se guardan
+        # en disco, un registro por línea, para respetar el orden de salida
+        def close_room():
+            writer.next_array()
+            spool.seek(0)
+            for encoded in spool:
+                writer.write_encoded(encoded.rstrip("\n"))
+
+        for section, furnitype in records:
+            if furnitype is None:
+                if section == ROOM_SECTION:
+                    close_room()
+                    room_closed = True
+                continue
+
+            try:
+                record = furnitype_to_dict(furnitype, section)
+            except Exception as e:
+                if recover:
+                    if quarantine is not None:
+                        quarantine.add(section, *records.current, e)
+                    continue
+                if not skip_invalid:
+                    raise
+                kind = "room" if section == ROOM_SECTION else "wall"
+                print(
+                    f"⚠️  Error procesando {kind} item ID {furnitype.get('id', 'desconocido')}: {e}"
+                )
+                continue
+
+            if section == WALL_SECTION and not room_closed:
+                spool.write(encode_record(record) + "\n")
+            else:
+                writer.write(record)
+            counts[section] += 1
+
+            if on_record is not None:
+                on_record(section, record)
+
+        if not room_closed:
+            close_room()
+
+    return counts[ROOM_SECTION], counts[WALL_SECTION]
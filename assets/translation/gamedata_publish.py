@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Publicación de gamedata con nombres direccionados por contenido
+Crea FurnitureData.<hash>.json (y sus .gz/.br), actualiza las URLs de
+renderer-config.json y elimina generaciones antiguas, para que los
+clientes puedan cachear estos archivos como inmutables
+"""
+
+import json
+import os
+import re
+import shutil
+
+from build_manifest import file_sha256
+from precompress import load_state
+
+HASH_LENGTH = 12
+MAPPING_NAME = "gamedata-files.json"
+DEFAULT_KEEP_GENERATIONS = 2
+COMPRESSED_SUFFIXES = ("", ".gz", ".br")
+
+# Clave de renderer-config.json que apunta a cada archivo de gamedata
+RENDERER_CONFIG_KEYS = {
+    "FurnitureData.json": "furnidata.url",
+    "ProductData.json": "productdata.url",
+    "FigureData.json": "avatar.figuredata.url",
+    "ExternalTexts.json": "external.texts.url",
+}
+
+
+def hashed_name(file_name, digest):
+    """
+    FurnitureData.json -> FurnitureData.<hash>.json
+    """
+    stem, ext = os.path.splitext(file_name)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _generation_pattern(file_name):
+    stem, ext = os.path.splitext(file_name)
+    return re.compile(
+        rf"^{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(ext)}$"
+    )
+
+
+def _copy_file(src_path, dst_path):
+    # Copia y no hard link: los conversores reescriben sus salidas en el
+    # mismo inode, lo que cambiaría el contenido de un nombre con hash.
+    # La copia tiene como mtime el momento de publicación.
+    tmp_path = dst_path + ".tmp"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+
+def publish_hashed(gamedata_dir, file_names=tuple(RENDERER_CONFIG_KEYS)):
+    """
+    Crea la versión con hash de cada archivo existente y sus precomprimidos
+    Retorna {nombre original: nombre con hash} y lo guarda en gamedata-files.json
+    """
+    precompress_state = load_state(gamedata_dir)
+    mapping = {}
+    for file_name in file_names:
+        src_path = os.path.join(gamedata_dir, file_name)
+        digest = file_sha256(src_path)
+        if digest is None:
+            continue
+
+        # Solo se publican los precomprimidos generados a partir de este contenido
+        compressed = precompress_state.get(src_path, {})
+        suffixes = [""]
+        if compressed.get("sha256") == digest:
+            suffixes += [f".{encoding}" for encoding in compressed.get("encodings", ())]
+
+        target_name = hashed_name(file_name, digest)
+        for suffix in suffixes:
+            src = src_path + suffix
+            dst = os.path.join(gamedata_dir, target_name + suffix)
+            # El contenido de un nombre con hash nunca cambia: si ya existe se
+            # reutiliza, marcándolo como la generación más reciente
+            if os.path.exists(dst):
+                os.utime(dst)
+            elif os.path.exists(src):
+                _copy_file(src, dst)
+
+        mapping[file_name] = target_name
+        print(f"   🔗 {file_name} → {target_name}")
+
+    tmp_path = os.path.join(gamedata_dir, MAPPING_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(mapping, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(gamedata_dir, MAPPING_NAME))
+
+    return mapping
+
+
+def collect_generations(gamedata_dir, mapping, keep=DEFAULT_KEEP_GENERATIONS):
+    """
+    Elimina las generaciones con hash más antiguas de cada archivo
+    Conserva la actual y las más recientes hasta completar keep, para que
+    los clientes con una sesión abierta sigan encontrando sus archivos
+    Retorna la cantidad de archivos eliminados
+    """
+    removed = 0
+    entries = os.listdir(gamedata_dir)
+    for file_name, current in mapping.items():
+        pattern = _generation_pattern(file_name)
+        others = [name for name in entries if pattern.match(name) and name != current]
+        others.sort(
+            key=lambda name: os.path.getmtime(os.path.join(gamedata_dir, name)),
+            reverse=True,
+        )
+
+        for name in others[max(keep - 1, 0):]:
+            for suffix in COMPRESSED_SUFFIXES:
+                path = os.path.join(gamedata_dir, name + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+    return removed
+
+
+def rewrite_renderer_config(config_path, mapping):
+    """
+    Apunta las URLs de gamedata de renderer-config.json a los archivos con hash
+    Solo se reemplazan los strings de las URLs, conservando el formato del archivo
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    config = json.loads(text)
+
+    replacements = {}
+    for file_name, target_name in mapping.items():
+        key = RENDERER_CONFIG_KEYS.get(file_name)
+        if key not in config:
+            continue
+
+        # Acepta tanto el nombre original como una generación anterior
+        stem, ext = os.path.splitext(file_name)
+        pattern = re.compile(
+            rf"{re.escape(stem)}(\.[0-9a-f]{{{HASH_LENGTH}}})?{re.escape(ext)}$"
+        )
+
+        value = config[key]
+        urls = value if isinstance(value, list) else [value]
+        for url in urls:
+            if isinstance(url, str):
+                new_url = pattern.sub(target_name, url)
+                if new_url != url:
+                    replacements[url] = new_url
+
+    for url, new_url in replacements.items():
+        text = text.replace(json.dumps(url), json.dumps(new_url))
+    # Verificar que el resultado sigue siendo JSON válido antes de escribir
+    json.loads(text)
+
+    # Se reescribe en el mismo inode: compose monta este archivo solo en el
+    # contenedor de nitro, y un os.replace dejaría al contenedor con el anterior
+    with open(config_path, "r+", encoding="utf-8") as f:
+        f.write(text)
+        f.truncate()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Escritor JSON incremental para los archivos de gamedata
+Emite los arrays de registros uno por uno, con la misma salida que
+json.dump(result, f, separators=(",", ":"))
+"""
+
+import json
+import os
+
+SEPARATORS = (",", ":")
+
+# Estructura de los archivos generados: rutas de claves hasta cada array
+FURNITUREDATA_LAYOUT = (
+    ("roomitemtypes", "furnitype"),
+    ("wallitemtypes", "furnitype"),
+)
+PRODUCTDATA_LAYOUT = (("productdata", "product"),)
+
+
+def encode_record(record):
+    """
+    Serializa un registro con el formato compacto de los archivos de gamedata
+    """
+    return json.dumps(record, separators=SEPARATORS)
+
+
+class StreamingJSONWriter:
+    """
+    Escribe un documento {"a":{"b":[...]},"c":{"d":[...]}} registro a registro
+
+    Se usa como context manager: la salida va a un archivo temporal que solo
+    reemplaza al destino si el bloque termina sin errores. suspend() cierra
+    el archivo temporal sin terminar el documento; la siguiente escritura
+    lo reabre.
+    """
+
+    def __init__(self, json_file_path, layout):
+        self.json_file_path = json_file_path
+        self.tmp_path = json_file_path + ".tmp"
+        self.layout = layout
+        self.array_index = -1
+        self.counts = [0] * len(layout)
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.file.write("{")
+        self.next_array()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if exc_type is None:
+                while self.array_index < len(self.layout) - 1:
+                    self.next_array()
+                self._close_array()
+                self._file().write("}")
+            self.suspend()
+            if exc_type is None:
+                os.replace(self.tmp_path, self.json_file_path)
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        return False
+
+    def suspend(self):
+        """
+        Cierra el archivo temporal para liberar su descriptor
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _file(self):
+        if self.file is None:
+            self.file = open(self.tmp_path, "a", encoding="utf-8")
+        return self.file
+
+    def _close_array(self):
+        path = self.layout[self.array_index]
+        self._file().write("]" + "}" * (len(path) - 1))
+
+    def next_array(self):
+        """
+        Cierra el array actual y abre el siguiente del layout
+        """
+        if self.array_index >= 0:
+            self._close_array()
+            self._file().write(",")
+        self.array_index += 1
+
+        path = self.layout[self.array_index]
+        keys = [json.dumps(key) + ":" for key in path]
+        self._file().write("{".join(keys) + "[")
+
+    def write(self, record):
+        """
+        Agrega un registro al array actual
+        """
+        self.write_encoded(encode_record(record))
+
+    def write_encoded(self, encoded):
+        """
+        Agrega un registro ya serializado con encode_record
+        """
+        file = self._file()
+        if self.counts[self.array_index]:
+            file.write(",")
+        file.write(encoded)
+        self.counts[self.array_index] += 1
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Genera archivos .gz y .br precomprimidos junto a cada JSON de gamedata
+Nginx los sirve directamente (gzip_static / brotli_static) en vez de
+comprimir en cada request. Solo se recomprimen los archivos cuyo
+contenido cambió desde la última ejecución.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import file_sha256
+
+try:
+    import brotli
+except ImportError:  # py3-brotli es opcional
+    brotli = None
+
+STATE_NAME = ".precompress-manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+# Archivos de gamedata que sirve nginx
+GAMEDATA_FILES = (
+    "FigureData.json",
+    "FurnitureData.json",
+    "ProductData.json",
+    "ExternalTexts.json",
+)
+
+
+def available_encodings():
+    """
+    Extensiones que se pueden generar con los módulos instalados
+    """
+    return ("gz", "br") if brotli is not None else ("gz",)
+
+
+def _write_gzip(src_path, dst_path):
+    # mtime=0 para que el mismo contenido produzca siempre el mismo .gz
+    with open(src_path, "rb") as src, open(dst_path, "wb") as raw:
+        with gzip.GzipFile(
+            filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0
+        ) as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _write_brotli(src_path, dst_path):
+    compressor = brotli.Compressor(quality=11)
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+            dst.write(compressor.process(chunk))
+        dst.write(compressor.finish())
+
+
+WRITERS = {"gz": _write_gzip, "br": _write_brotli}
+
+
+def compress_file(file_path, encodings):
+    """
+    Escribe file_path.<encoding> para cada encoding, de forma atómica
+    Retorna (file_path, {encoding: tamaño})
+    """
+    sizes = {}
+    for encoding in encodings:
+        dst_path = f"{file_path}.{encoding}"
+        tmp_path = dst_path + ".tmp"
+        try:
+            WRITERS[encoding](file_path, tmp_path)
+            os.replace(tmp_path, dst_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        sizes[encoding] = os.path.getsize(dst_path)
+    return file_path, sizes
+
+
+def load_state(state_dir):
+    """
+    Estado de la última precompresión: {ruta: {"sha256", "encodings"}}
+    """
+    state_path = os.path.join(state_dir, STATE_NAME)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state_path, state):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def precompress_files(file_paths, state_dir, parallel=True):
+    """
+    Comprime los archivos que cambiaron desde la última ejecución
+    El estado (hash del JSON y encodings generados) se guarda en state_dir
+    Retorna la cantidad de archivos recomprimidos
+    """
+    encodings = available_encodings()
+    state_path = os.path.join(state_dir, STATE_NAME)
+    state = load_state(state_dir)
+
+    pending = []
+    for file_path in file_paths:
+        digest = file_sha256(file_path)
+        if digest is None:
+            continue
+
+        entry = state.get(file_path, {})
+        up_to_date = entry.get("sha256") == digest and all(
+            encoding in entry.get("encodings", ())
+            and os.path.exists(f"{file_path}.{encoding}")
+            for encoding in encodings
+        )
+        if not up_to_date:
+            pending.append((file_path, digest))
+
+    if brotli is None:
+        print("ℹ️  Módulo brotli no disponible, solo se generan archivos .gz")
+
+    if not pending:
+        print("♻️  Archivos precomprimidos al día")
+        return 0
+
+    print(f"🗜️  Precomprimiendo {len(pending)} archivos ({', '.join(encodings)})...")
+    if parallel and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as pool:
+            futures = [
+                pool.submit(compress_file, file_path, encodings)
+                for file_path, _ in pending
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [compress_file(file_path, encodings) for file_path, _ in pending]
+
+    for (file_path, digest), (_, sizes) in zip(pending, results):
+        state[file_path] = {"sha256": digest, "encodings": sorted(sizes)}
+        original = os.path.getsize(file_path)
+        summary = ", ".join(f"{enc}: {size} bytes" for enc, size in sorted(sizes.items()))
+        print(f"   ✅ {os.path.basename(file_path)} ({original} bytes) → {summary}")
+
+    _save_state(state_path, state)
+    return len(pending)
+
+
+def gamedata_files(gamedata_dir, extra_paths=()):
+    """
+    JSON de gamedata existentes en gamedata_dir más rutas adicionales
+    """
+    paths = [os.path.join(gamedata_dir, name) for name in GAMEDATA_FILES]
+    paths.extend(extra_paths)
+    return [path for path in paths if os.path.exists(path)]
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Uso: python3 precompress.py <directorio_gamedata>")
+        sys.exit(1)
+
+    gamedata_dir = sys.argv[1]
+    precompress_files(gamedata_files(gamedata_dir), gamedata_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Conversión en streaming de productdata.txt a ProductData.json
+Lee, limpia y parsea el archivo línea por línea y escribe cada producto
+apenas se decodifica, sin copias completas del archivo en memoria
+
+Con workers > 1 el archivo se divide en rangos de bytes alineados a
+líneas que se decodifican en un pool de procesos; los resultados se
+escriben en el orden original, así que la salida es la misma.
+"""
+
+import io
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from json_stream import PRODUCTDATA_LAYOUT, StreamingJSONWriter, encode_record
+
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
+
+# Cantidad de errores que se muestran en el log
+MAX_REPORTED_ERRORS = 5
+
+# Tamaño aproximado de cada rango de bytes en modo paralelo
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _iter_clean_lines(txt_file):
+    """
+    Produce (índice de línea, línea limpia) por cada línea con contenido
+    El índice cuenta todas las líneas del archivo, empezando en 1
+    """
+    for raw_index, raw_line in enumerate(txt_file, 1):
+        line = CONTROL_CHARS.sub("", raw_line).strip()
+        if line:
+            yield raw_index, line
+
+
+def iter_line_products(line):
+    """
+    Decodifica una línea (un array JSON) y produce sus productos
+
+    Si un producto falla, los anteriores de la misma línea ya fueron
+    producidos, igual que en la conversión original.
+    """
+    products_array = json.loads(line)
+    for product_info in products_array:
+        if len(product_info) >= 3:
+            yield {
+                "code": str(product_info[0]).strip(),
+                "name": str(product_info[1]).strip(),
+                "description": str(product_info[2]).strip(),
+            }
+
+
+def parse_product_line(line):
+    """
+    Retorna (productos serializados, error) de una línea
+    error es None o (tipo de mensaje, detalle)
+    """
+    encoded = []
+    try:
+        for product_data in iter_line_products(line):
+            encoded.append(encode_record(product_data))
+    except json.JSONDecodeError as e:
+        return encoded, ("Error línea", str(e))
+    except Exception as e:
+        return encoded, ("Error procesando línea", str(e))
+    return encoded, None
+
+
+def chunk_ranges(txt_file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Divide el archivo en rangos (inicio, fin) de bytes que terminan en un
+    salto de línea, para que ninguna línea quede repartida entre dos rangos
+    """
+    file_size = os.path.getsize(txt_file_path)
+    ranges = []
+    with open(txt_file_path, "rb") as f:
+        start = 0
+        while start < file_size:
+            end = start + chunk_size
+            if end >= file_size:
+                end = file_size
+            else:
+                f.seek(end)
+                f.readline()
+                end = min(f.tell(), file_size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_productdata_chunk(txt_file_path, start, end):
+    """
+    Decodifica las líneas de un rango de bytes (se ejecuta en un worker)
+
+    Retorna (líneas del rango, resultados), donde cada resultado es
+    (índice de línea dentro del rango, productos serializados, error)
+    """
+    with open(txt_file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Misma decodificación y saltos de línea universales que open() en modo texto
+    text_file = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="ignore")
+
+    line_count = 0
+    results = []
+    for line_count, raw_line in enumerate(text_file, 1):
+        line = CONTROL_CHARS.sub("", raw_line).strip()
+        if line:
+            encoded, error = parse_product_line(line)
+            results.append((line_count, encoded, error))
+    return line_count, results
+
+
+def _iter_parallel_results(txt_file_path, workers, chunk_size):
+    """
+    Produce (índice de línea en el archivo, productos, error) en orden,
+    manteniendo a lo sumo 2 rangos pendientes por worker
+    """
+    ranges = chunk_ranges(txt_file_path, chunk_size)
+    line_offset = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        next_range = 0
+        while next_range < len(ranges) or futures:
+            while next_range < len(ranges) and len(futures) < workers * 2:
+                start, end = ranges[next_range]
+                futures.append(pool.submit(parse_productdata_chunk, txt_file_path, start, end))
+                next_range += 1
+
+            line_count, results = futures.pop(0).result()
+            for local_index, encoded, error in results:
+                yield line_offset + local_index, encoded, error
+            line_offset += line_count
+
+
+def _iter_sequential_results(txt_file_path):
+    with open(txt_file_path, "r", encoding="utf-8", errors="ignore") as f:
+        for raw_index, line in _iter_clean_lines(f):
+            encoded, error = parse_product_line(line)
+            yield raw_index, encoded, error
+
+
+def write_productdata_json(
+    txt_file_path, json_file_path, workers=1, chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """
+    Convierte productdata.txt a ProductData.json en streaming
+    Con workers > 1 decodifica rangos del archivo en paralelo
+    Retorna (productos procesados, líneas con errores)
+    """
+    processed_count = 0
+    error_count = 0
+
+    if workers > 1:
+        results = _iter_parallel_results(txt_file_path, workers, chunk_size)
+    else:
+        results = _iter_sequential_results(txt_file_path)
+
+    leading_blank = None
+    with StreamingJSONWriter(json_file_path, PRODUCTDATA_LAYOUT) as writer:
+        for raw_index, encoded, error in results:
+            if leading_blank is None:
+                leading_blank = raw_index - 1
+
+            for product in encoded:
+                writer.write_encoded(product)
+            processed_count += len(encoded)
+
+            if error is not None:
+                error_count += 1
+                if error_count <= MAX_REPORTED_ERRORS:
+                    label, detail = error
+                    print(f"⚠️  {label} {raw_index - leading_blank}: {detail}")
+
+    return processed_count, error_count
@@ -8,23 +8,25 @@ import os
 import sys
 import ast
 
+from json_stream import PRODUCTDATA_LAYOUT, StreamingJSONWriter
+
 
 def txt_to_json(txt_file_path, json_file_path):
     """
     Convierte productdata.txt a ProductData.json
     """
     try:
-        # Initialize the result dictionary
-        result = {"productdata": {"product": []}}
-
-        # Read the text file
-        with open(txt_file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        processed_count = 0
+
+        # Read the text file line by line, writing each product right away
+        with open(txt_file_path, "r", encoding="utf-8") as f, StreamingJSONWriter(
+            json_file_path, PRODUCTDATA_LAYOUT
+        ) as writer:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
 
-        # Parse each line as a JSON array
-        lines = content.strip().split("\n")
-        for line in lines:
-            if line.strip():
                 try:
                     # Parse the line as JSON array
                     products_array = json.loads(line)
@@ -37,18 +39,15 @@ def txt_to_json(txt_file_path, json_file_path):
                                 "name": product_info[1],
                                 "description": product_info[2],
                             }
-                            result["productdata"]["product"].append(product_data)
+                            writer.write(product_data)
+                            processed_count += 1
 
                 except json.JSONDecodeError as e:
                     print(f"⚠️  Error al parsear línea: {line[:50]}... - {e}")
                     continue
 
-        # Write JSON file
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, separators=(",", ":"))
-
         print(f"✅ Archivo {json_file_path} generado exitosamente!")
-        print(f"📊 Productos procesados: {len(result['productdata']['product'])}")
+        print(f"📊 Productos procesados: {processed_count}")
         return True
 
     except Exception as e:
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Diagnóstico acotado de una reparación de XML
+Cuenta los defectos por categoría y guarda solo una muestra de los
+primeros de cada una, con su ubicación, en lugar de imprimir cada uno.
+Al final se escribe un único reporte JSON; un stream verbose opcional
+recibe todos los defectos, uno por línea en JSON, a medida que aparecen.
+"""
+
+import json
+import os
+
+REPORT_FORMAT = 1
+# Defectos que se guardan como muestra por categoría
+DEFAULT_SAMPLE_LIMIT = 20
+# Caracteres de texto que se guardan por defecto de la muestra
+SAMPLE_TEXT_LENGTH = 80
+
+
+def shorten(text, length=SAMPLE_TEXT_LENGTH):
+    """
+    Recorta text a length caracteres, marcando el corte con …
+    """
+    if len(text) <= length:
+        return text
+    return text[: length - 1] + "…"
+
+
+class RepairDiagnostics:
+    """
+    Defectos por categoría: counts tiene la cantidad de cada una y samples
+    los primeros sample_limit, cada uno como {ubicación..., "text": ...}
+
+    Las subclases fijan categories (orden del reporte) y labels (texto de
+    print_summary). verbose, si se indica, es un stream de texto.
+    """
+
+    categories = ()
+    labels = {}
+
+    def __init__(self, sample_limit=DEFAULT_SAMPLE_LIMIT, verbose=None):
+        self.sample_limit = sample_limit
+        self.verbose = verbose
+        self.counts = dict.fromkeys(self.categories, 0)
+        self.samples = {category: [] for category in self.categories}
+
+    def record(self, category, text="", **location):
+        """
+        Registra un defecto; location son sus coordenadas (offset, line...)
+        """
+        self.counts[category] = self.counts.get(category, 0) + 1
+        samples = self.samples.setdefault(category, [])
+        if len(samples) < self.sample_limit or self.verbose is not None:
+            sample = dict(location, text=shorten(text))
+            if len(samples) < self.sample_limit:
+                samples.append(sample)
+            if self.verbose is not None:
+                self._write_verbose(category, sample)
+
+    def _write_verbose(self, category, sample):
+        self.verbose.write(
+            json.dumps(dict(category=category, **sample), ensure_ascii=False) + "\n"
+        )
+
+    def extend(self, other, offset=0):
+        """
+        Agrega los defectos de other, que sigue a este en el documento
+        offset se suma a los offsets de la muestra de other
+        """
+        for category, count in other.counts.items():
+            self.counts[category] = self.counts.get(category, 0) + count
+            samples = self.samples.setdefault(category, [])
+            for sample in other.samples.get(category, ()):
+                if len(samples) >= self.sample_limit:
+                    break
+                if offset and "offset" in sample:
+                    sample = dict(sample, offset=sample["offset"] + offset)
+                samples.append(sample)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def to_dict(self):
+        return {
+            "format": REPORT_FORMAT,
+            "total": self.total,
+            "counts": self.counts,
+            "sample_limit": self.sample_limit,
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        diagnostics = cls(sample_limit=data["sample_limit"])
+        diagnostics.counts.update(data["counts"])
+        for category, samples in data["samples"].items():
+            diagnostics.samples[category] = [dict(sample) for sample in samples]
+        return diagnostics
+
+    def print_summary(self):
+        for category, count in self.counts.items():
+            if count:
+                label = self.labels.get(category, category)
+                print(f"🔍 Encontrados {count} {label}")
+
+    def write_json(self, path):
+        """
+        Escribe el reporte de forma atómica
+        """
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
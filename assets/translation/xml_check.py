@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Verificación rápida de XML bien formado antes de repararlo
+Pasa el archivo por expat en bloques, sin construir ningún árbol, y
+guarda el resultado por hash del archivo para no repetirlo mientras
+el archivo no cambie
+"""
+
+import json
+import os
+from xml.parsers import expat
+
+from build_manifest import file_sha256
+
+CHECK_CACHE_NAME = ".xml-check-cache.json"
+CHECK_CACHE_FORMAT = 1
+# Cantidad de resultados que se conservan en el caché
+CHECK_CACHE_LIMIT = 32
+
+CHECK_CHUNK_SIZE = 1024 * 1024
+
+
+def find_xml_error(xml_file_path, chunk_size=CHECK_CHUNK_SIZE):
+    """
+    Parsea el archivo con expat en bloques
+    Retorna None si está bien formado o (línea, columna, mensaje) del
+    primer error
+    """
+    parser = expat.ParserCreate()
+    try:
+        with open(xml_file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                parser.Parse(chunk, False)
+        parser.Parse(b"", True)
+    except expat.ExpatError as e:
+        return e.lineno, e.offset + 1, expat.ErrorString(e.code)
+    return None
+
+
+class XMLCheckCache:
+    """
+    Resultados de find_xml_error por sha256, guardados junto al XML
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, CHECK_CACHE_NAME)
+        self.results = {}
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == CHECK_CACHE_FORMAT:
+                self.results = data.get("results", {})
+        except (OSError, ValueError):
+            # Caché inexistente o corrupto: se vuelve a verificar
+            self.results = {}
+
+    def get(self, digest):
+        """
+        Retorna el resultado guardado para digest, o None si no hay
+        """
+        return self.results.get(digest)
+
+    def record(self, digest, error):
+        """
+        Registra el resultado de un archivo, descartando los más viejos
+        """
+        self.results.pop(digest, None)
+        self.results[digest] = {"well_formed": error is None, "error": error}
+        while len(self.results) > CHECK_CACHE_LIMIT:
+            del self.results[next(iter(self.results))]
+
+    def save(self):
+        """
+        Escribe el caché de forma atómica; si no se puede escribir se ignora
+        """
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"format": CHECK_CACHE_FORMAT, "results": self.results}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def is_well_formed(xml_file_path, use_cache=True, digest=None):
+    """
+    True si el XML está bien formado
+    Con use_cache el resultado se reutiliza mientras el archivo no cambie;
+    digest evita volver a calcular el sha256 si el llamador ya lo tiene
+    """
+    if not use_cache:
+        return find_xml_error(xml_file_path) is None
+
+    if digest is None:
+        digest = file_sha256(xml_file_path)
+    cache = XMLCheckCache(os.path.dirname(os.path.abspath(xml_file_path)))
+    cached = cache.get(digest)
+    if cached is not None:
+        return cached["well_formed"]
+
+    error = find_xml_error(xml_file_path)
+    cache.record(digest, list(error) if error else None)
+    cache.save()
+    return error is None
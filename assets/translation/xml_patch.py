@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Parches de reparación de furnidata.xml guardados por hash del original
+La primera reparación de un archivo registra sus correcciones como
+ediciones (offset en bytes, largo, reemplazo). Cuando vuelve a llegar el
+mismo archivo las ediciones se aplican con una sola copia lineal, sin
+volver a pasar por el motor de reparación.
+"""
+
+import io
+import json
+import os
+
+from xml_repair import PatchRecorder, RepairReport, XMLRepairStream
+from xml_repair_parallel import ParallelRepairStream
+
+PATCH_DIR_NAME = ".xml-repair-patches"
+# Incrementar cuando cambien las correcciones del motor de reparación
+# o el formato del RepairReport
+PATCH_FORMAT = 3
+# Cantidad de parches que se conservan
+PATCH_LIMIT = 8
+
+
+class RepairPatch:
+    """
+    Ediciones (offset, largo, reemplazo en bytes) ordenadas por offset,
+    junto con el RepairReport de la reparación que las produjo
+    """
+
+    def __init__(self, edits, report):
+        self.edits = edits
+        self.report = report
+
+    def to_dict(self):
+        return {
+            "format": PATCH_FORMAT,
+            "edits": [
+                [offset, length, replacement.decode("utf-8")]
+                for offset, length, replacement in self.edits
+            ],
+            "report": self.report.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        edits = [
+            (offset, length, replacement.encode("utf-8"))
+            for offset, length, replacement in data["edits"]
+        ]
+        return cls(edits, RepairReport.from_dict(data["report"]))
+
+
+class PatchedReader(io.RawIOBase):
+    """
+    Aplica un RepairPatch mientras se lee el original: copia los bytes
+    entre ediciones y entrega los reemplazos en su lugar
+    """
+
+    def __init__(self, raw, patch):
+        super().__init__()
+        self.raw = raw
+        self.edits = iter(patch.edits)
+        self.next_edit = next(self.edits, None)
+        self.pos = 0
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        view = memoryview(target)
+        size = len(view)
+        filled = 0
+        while filled < size:
+            if self.pending:
+                count = min(size - filled, len(self.pending))
+                view[filled : filled + count] = self.pending[:count]
+                self.pending = self.pending[count:]
+                filled += count
+                continue
+
+            if self.next_edit is not None and self.pos == self.next_edit[0]:
+                _, length, replacement = self.next_edit
+                self.raw.read(length)
+                self.pos += length
+                self.pending = replacement
+                self.next_edit = next(self.edits, None)
+                continue
+
+            limit = size - filled
+            if self.next_edit is not None:
+                limit = min(limit, self.next_edit[0] - self.pos)
+            count = self.raw.readinto(view[filled : filled + limit])
+            if not count:
+                break
+            filled += count
+            self.pos += count
+        return filled
+
+
+class RepairPatchCache:
+    """
+    Parches guardados en un directorio junto al XML, uno por sha256
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.join(directory, PATCH_DIR_NAME)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, digest):
+        """
+        Retorna el RepairPatch guardado para digest, o None si no hay
+        """
+        try:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != PATCH_FORMAT:
+                return None
+            return RepairPatch.from_dict(data)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Parche inexistente o corrupto: se repara desde cero
+            return None
+
+    def save(self, digest, patch):
+        """
+        Guarda el parche de forma atómica y descarta los más viejos
+        Si no se puede escribir se ignora
+        """
+        path = self._path(digest)
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(patch.to_dict(), f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+
+            patches = sorted(
+                (
+                    entry
+                    for entry in os.scandir(self.directory)
+                    if entry.name.endswith(".json")
+                ),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+            for entry in patches[:-PATCH_LIMIT]:
+                os.remove(entry.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class CachedRepairStream(io.RawIOBase):
+    """
+    XML reparado a partir del original: aplica el parche guardado para
+    digest si existe; si no, repara (en paralelo con workers > 1) y al
+    terminar guarda las correcciones como parche para la próxima vez
+
+    verbose, si se indica, recibe cada defecto a medida que se corrige
+    (ver RepairDiagnostics); para eso siempre repara, en un solo proceso
+    """
+
+    def __init__(self, xml_file_path, digest, cache, workers=1, verbose=None):
+        super().__init__()
+        self.digest = digest
+        self.cache = cache
+        self.raw = None
+        patch = cache.load(digest) if verbose is None else None
+        self.from_patch = patch is not None
+        self.recording = not self.from_patch
+        if self.from_patch:
+            self.edits = patch.edits
+            self.raw = open(xml_file_path, "rb")
+            self.stream = PatchedReader(self.raw, patch)
+            self.report = patch.report
+        elif workers > 1 and verbose is None:
+            self.stream = ParallelRepairStream(xml_file_path, workers)
+            self.edits = self.stream.edits
+            self.report = self.stream.report
+        else:
+            recorder = PatchRecorder()
+            self.raw = open(xml_file_path, "rb")
+            self.stream = XMLRepairStream(
+                self.raw, recorder=recorder, report=RepairReport(verbose=verbose)
+            )
+            self.edits = recorder.edits
+            self.report = self.stream.report
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        size = self.stream.readinto(target)
+        if size == 0 and len(target) and self.recording:
+            # Los offsets solo valen si el original ya tenía saltos \n
+            if self.stream.newlines in (None, "\n"):
+                self.cache.save(self.digest, RepairPatch(self.edits, self.report))
+            self.recording = False
+        return size
+
+    def source_offset(self, position):
+        """
+        Offset en el original del byte position de la salida ya leída
+        Un byte agregado por una corrección se ubica en el inicio de esa
+        corrección; solo es exacto si el original tenía saltos \n
+        """
+        delta = 0
+        for offset, length, replacement in self.edits:
+            start = offset + delta
+            if position < start:
+                break
+            if position < start + len(replacement):
+                return offset
+            delta += len(replacement) - length
+        return position - delta
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+            if self.raw is not None:
+                self.raw.close()
+        super().close()
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+Motor de reparación de furnidata.xml en una sola pasada
+Recorre el documento una vez, deteniéndose solo en comillas, & y
+caracteres de control (los únicos puntos que pueden necesitar una
+corrección), y escribe la salida a medida que avanza.
+
+Aplica las mismas correcciones que las pasadas de regex de
+fix_specific_xml_errors:
+  1. customparams con comillas sin cerrar:  <customparams>a="b</customparams>
+  2. valores ="... que llegan a un tag de cierre:  ="b</tag>  ->  ="b"></tag>
+  3. caracteres de control inválidos en XML (se eliminan)
+  4. & que no forman parte de una entidad XML (se escapan como &amp;)
+  5. tags de cierre con comillas y > extra:  </tag">">  ->  </tag>
+  6. tags de cierre con comillas:  </tag">  ->  </tag>
+También reproduce cómo se combinan: las comillas que agrega una pasada
+pueden quedar dentro de un tag de cierre que corrigen las siguientes, y
+un =" dentro del tag que cerró el valor anterior no abre otro valor.
+
+XMLRepairStream aplica el mismo motor sobre una ventana deslizante del
+archivo original y entrega el XML reparado con read(), así que puede
+pasarse directamente a ET.iterparse sin escribir copias en disco.
+Cada corrección también se puede informar como una edición (inicio, fin,
+reemplazo) sobre el texto original, para guardarla como parche.
+"""
+
+import codecs
+import io
+import re
+
+from repair_diagnostics import RepairDiagnostics
+
+CUSTOMPARAMS_OPEN = "<customparams>"
+CUSTOMPARAMS_CLOSE = "</customparams>"
+
+CONTROL_CHARS = r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]"
+# Los caracteres de control se eliminan antes de corregir los tags de
+# cierre, así que cuentan como espacio en blanco dentro de ellos
+BLANK = rf"(?:\s|{CONTROL_CHARS})*"
+
+# Puntos del documento donde puede hacer falta una corrección
+TOKENS = re.compile(rf'["&]|{CONTROL_CHARS}')
+# Dentro de un valor sin cerrar solo pueden aparecer & y caracteres de control
+VALUE_TOKENS = re.compile(rf"&|{CONTROL_CHARS}")
+CONTROL = re.compile(CONTROL_CHARS)
+# Inicio de un tag de cierre una vez eliminados los caracteres de control
+CLOSING_OPEN = re.compile(rf"<{CONTROL_CHARS}*/")
+ENTITY = re.compile(r"&(?:amp|lt|gt|quot|apos);")
+BLANK_RUN = re.compile(BLANK)
+
+# Caracteres que se leen del original por cada bloque de XMLRepairStream
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Largo de la entidad más larga que se reconoce (&apos;)
+ENTITY_MAX_LENGTH = 6
+
+
+class NeedMoreData(Exception):
+    """
+    La corrección en curso depende de texto que todavía no se leyó
+    """
+
+
+class RepairReport(RepairDiagnostics):
+    """
+    Correcciones aplicadas por categoría, en el orden de las pasadas originales
+    Los offsets de la muestra son posiciones (en caracteres) del documento
+    """
+
+    categories = (
+        "customparams",
+        "unclosed_quotes",
+        "invalid_chars",
+        "ampersands",
+        "closing_tags_extra",
+        "closing_tags",
+    )
+    labels = {
+        "customparams": "patrones problemáticos en customparams",
+        "unclosed_quotes": "patrones de comillas mal cerradas",
+        "invalid_chars": "caracteres inválidos",
+        "ampersands": "caracteres & sin escapar",
+        "closing_tags_extra": "tags de cierre con comillas extra",
+        "closing_tags": "tags de cierre con comillas",
+    }
+
+
+class XMLRepairEngine:
+    """
+    Aplica las correcciones sobre content en un único recorrido hacia adelante
+    La salida se entrega en fragmentos a write, sin construir copias intermedias
+
+    Con eof=False content es solo una ventana del documento: run() se detiene
+    antes de la primera corrección que necesita texto posterior, y feed()
+    agrega el siguiente bloque descartando lo que ya no hace falta.
+
+    on_edit, si se indica, recibe cada corrección como (inicio, fin,
+    reemplazo) en posiciones del documento completo, en orden creciente.
+    """
+
+    def __init__(self, content, write, eof=True, on_edit=None, report=None):
+        self.content = content
+        self.write = write
+        self.eof = eof
+        self.on_edit = on_edit
+        self.pos = 0
+        # Posición en el documento del primer carácter de la ventana
+        self.base = 0
+        # Fin (en el documento) del último tag de cierre que consumió la
+        # pasada de valores: los =" anteriores no abren un valor
+        self.values_end = 0
+        # Posición en el documento del último > agregado por esa pasada
+        self.segment_start = 0
+        self.report = report if report is not None else RepairReport()
+
+    def _edit(self, start, end, replacement):
+        if self.on_edit is not None:
+            self.on_edit(self.base + start, self.base + end, replacement)
+
+    def _need(self, position):
+        """
+        Pide más texto si position cae fuera de la ventana actual
+        """
+        if position >= len(self.content) and not self.eof:
+            raise NeedMoreData
+
+    def _window_start(self):
+        """
+        Primer carácter que todavía puede hacer falta: las correcciones
+        miran hacia atrás hasta el último < o > y el carácter previo
+        """
+        content = self.content
+        pos = self.pos
+        return max(
+            0,
+            min(content.rfind("<", 0, pos), content.rfind(">", 0, pos), pos - 1),
+        )
+
+    def feed(self, text, eof=False):
+        """
+        Agrega text a la ventana y procesa todo lo que ya se puede corregir
+        """
+        start = self._window_start()
+        self.content = self.content[start:] + text
+        self.pos -= start
+        self.base += start
+        self.eof = eof
+        return self.run()
+
+    def _copy(self, start, end):
+        """
+        Copia content[start:end] escapando & y eliminando caracteres de control
+        """
+        content = self.content
+        pos = start
+        while True:
+            match = VALUE_TOKENS.search(content, pos, end)
+            if match is None:
+                self.write(content[pos:end])
+                return
+            index = match.start()
+            self.write(content[pos:index])
+            pos = self._fix_char(index)
+
+    def _fix_char(self, index):
+        """
+        Corrige un & o un carácter de control y retorna la posición siguiente
+        """
+        content = self.content
+        if content[index] != "&":
+            self.report.record("invalid_chars", content[index], offset=self.base + index)
+            self._edit(index, index + 1, "")
+            return index + 1
+
+        self._need(index + ENTITY_MAX_LENGTH - 1)
+        entity = ENTITY.match(content, index)
+        if entity is not None:
+            self.write(entity.group(0))
+            return entity.end()
+
+        self.write("&amp;")
+        self._edit(index, index + 1, "&amp;")
+        self.report.record(
+            "ampersands",
+            content[index : index + ENTITY_MAX_LENGTH],
+            offset=self.base + index,
+        )
+        return index + 1
+
+    def _closing_tag_end(self, start):
+        """
+        Fin del tag de cierre </...> que empieza en start, o -1 si no es válido
+        """
+        end = self.content.find(">", start + 2)
+        if end == -1:
+            self._need(len(self.content))
+        if end <= start + 2:
+            return -1
+        return end
+
+    def _fix_value(self, quote_index):
+        """
+        Revisa el valor que abre ="... y retorna la posición siguiente
+        Si llega a un tag de cierre antes de la próxima comilla, lo cierra
+        """
+        content = self.content
+        # La pasada de valores no superpone coincidencias: un =" dentro del
+        # tag de cierre que cerró el valor anterior es una comilla común
+        if self.base + quote_index < self.values_end:
+            return self._fix_quote(quote_index)
+
+        index = quote_index - 1
+        value_start = quote_index + 1
+        quote = content.find('"', value_start)
+        if quote == -1:
+            self._need(len(content))
+            quote = len(content)
+        else:
+            # Los tags de cierre previos a la comilla terminan antes de este >,
+            # y las entidades del valor no pasan de la comilla
+            self._need(quote + ENTITY_MAX_LENGTH - 1)
+            if content.find(">", quote) == -1:
+                self._need(len(content))
+
+        # customparams se corrige primero, como en la pasada original: basta
+        # con cerrar la comilla si el contenido tiene un número impar
+        tag_start = content.rfind("<", 0, index)
+        if content.startswith(CUSTOMPARAMS_OPEN, tag_start):
+            closing = content.rfind(CUSTOMPARAMS_CLOSE, value_start, quote)
+            if closing != -1:
+                inner_start = tag_start + len(CUSTOMPARAMS_OPEN)
+                self.report.record(
+                    "customparams",
+                    content[inner_start:closing],
+                    offset=self.base + inner_start,
+                )
+                if (content.count('"', inner_start, index) + 1) % 2 == 1:
+                    # La comilla agregada pasa a ser la próxima comilla: si
+                    # antes hay otro tag de cierre, el valor se cierra ahí
+                    end = self._close_value(value_start, closing, quote_index)
+                    if end == -1:
+                        self.write('"')
+                        end = value_start
+                    self._copy(end, closing)
+                    self.write('"')
+                    self._edit(closing, closing, '"')
+                    if (
+                        closing > end
+                        and content[closing - 1] == "="
+                        and self.base + closing > self.values_end
+                    ):
+                        # La comilla agregada forma un =" nuevo, que la pasada
+                        # de valores cierra en </customparams> o más adelante
+                        return self._close_value(closing, quote)
+                    return closing
+
+        end = self._close_value(value_start, quote, quote_index)
+        if end == -1:
+            # Sin tag de cierre que cerrar, la comilla queda para las
+            # pasadas de tags de cierre
+            return self._fix_quote(quote_index)
+        return end
+
+    def _close_value(self, value_start, quote, quote_index=None):
+        """
+        Cierra el valor que empieza en value_start antes del último tag de
+        cierre previo a quote; si se indica quote_index también escribe la
+        comilla de apertura (si no, el llamador ya la escribió)
+        Las pasadas de tags de cierre corren después sobre ese resultado:
+        si la comilla de apertura o la agregada quedan al final de un tag de
+        cierre, se descartan igual que en ellas
+        Retorna la posición donde sigue el recorrido, o -1 si no hay tag
+        """
+        content = self.content
+        closing = content.rfind("</", value_start, quote)
+        while closing != -1 and self._closing_tag_end(closing) == -1:
+            closing = content.rfind("</", value_start, closing)
+        if closing == -1:
+            return -1
+
+        tag_end = self._closing_tag_end(closing)
+        self.report.record(
+            "unclosed_quotes",
+            content[value_start : tag_end + 1],
+            offset=self.base + value_start,
+        )
+        self.values_end = self.base + tag_end
+
+        pos = value_start
+        opening = None
+        if quote_index is not None:
+            opening = self._closing_tag_at(quote_index)
+        gt = self._skip_blank(value_start) if opening is not None else closing
+        if gt < closing and content[gt] == ">":
+            # La comilla de apertura cierra un tag de cierre: ="  >
+            tag_start, tag = opening
+            end = gt + 1
+            after = self._skip_blank(end)
+            added_extra = after == closing
+            if added_extra:
+                # ="  >  "> : la comilla agregada es el " sobrante
+                category, end = "closing_tags_extra", closing
+            elif content[after] == ">":
+                category, end = "closing_tags_extra", after + 1
+            else:
+                category = "closing_tags"
+            self.report.record(category, tag, offset=self.base + tag_start)
+            self._record_controls(quote_index, end)
+            self.write(">")
+            self._edit(quote_index, end, ">")
+            if added_extra:
+                self.segment_start = self.base + closing
+                return closing
+            pos = end
+        elif quote_index is not None:
+            self.write('"')
+
+        self._copy(pos, closing)
+        added = self._closing_tag_at(closing)
+        if added is not None:
+            # La comilla agregada termina un tag de cierre: solo queda el >
+            tag_start, tag = added
+            self.report.record("closing_tags", tag, offset=self.base + tag_start)
+            self.write(">")
+            self._edit(closing, closing, ">")
+        else:
+            self.write('">')
+            self._edit(closing, closing, '">')
+        self.segment_start = self.base + closing
+        return closing
+
+    def _closing_tag_at(self, position):
+        """
+        (inicio, tag) del tag de cierre </tag que queda abierto justo antes
+        de position, tal como lo ven las pasadas de tags de cierre (sin
+        caracteres de control), o None
+        """
+        content = self.content
+        start = max(content.rfind(">", 0, position) + 1, self.segment_start - self.base)
+        match = CLOSING_OPEN.search(content, start, position)
+        if match is None:
+            return None
+        tag = CONTROL.sub("", content[match.end() : position])
+        if not tag:
+            return None
+        return match.start(), tag
+
+    def _record_controls(self, start, end):
+        # Caracteres de control descartados junto con las comillas sobrantes
+        for control in CONTROL.finditer(self.content, start, end):
+            self.report.record(
+                "invalid_chars", control.group(0), offset=self.base + control.start()
+            )
+
+    def _fix_quote(self, quote_index):
+        """
+        Comilla que no abre un valor: corrige el tag de cierre que termina,
+        si lo hay, y retorna la posición siguiente
+        """
+        end = self._fix_closing_tag(quote_index)
+        if end == -1:
+            self.write('"')
+            end = quote_index + 1
+        return end
+
+    def _fix_closing_tag(self, quote_index):
+        """
+        </tag">  ->  </tag>, descartando también un ">  sobrante a continuación
+        El tag hasta la comilla ya fue escrito; retorna la posición siguiente
+        o -1 si la comilla no cierra un tag de cierre
+        """
+        content = self.content
+        gt = self._skip_blank(quote_index + 1)
+        if gt < len(content) and content[gt] == '"':
+            return self._fix_inner_quote(quote_index, gt)
+        if gt == len(content) or content[gt] != ">":
+            return -1
+
+        opening = self._closing_tag_at(quote_index)
+        if opening is None:
+            return -1
+
+        tag_start, tag = opening
+        end = gt + 1
+        extra_end = self._extra_end(end)
+        if extra_end != -1:
+            self.report.record("closing_tags_extra", tag, offset=self.base + tag_start)
+            end = extra_end
+        else:
+            self.report.record("closing_tags", tag, offset=self.base + tag_start)
+
+        self._record_controls(quote_index, end)
+        self.write(">")
+        self._edit(quote_index, end, ">")
+        return end
+
+    def _fix_inner_quote(self, quote_index, next_quote):
+        """
+        Comilla seguida de otra en el mismo tag de cierre:  </tag" ">">
+        Si la siguiente se corrige con su "> sobrante, la pasada de tags de
+        cierre con comillas ve después </tag" > y descarta también esta
+        Retorna next_quote en ese caso, o -1
+        """
+        content = self.content
+        gt = self._skip_blank(next_quote + 1)
+        if gt == len(content) or content[gt] != ">" or self._extra_end(gt + 1) == -1:
+            return -1
+        opening = self._closing_tag_at(quote_index)
+        if opening is None:
+            return -1
+
+        tag_start, tag = opening
+        self.report.record("closing_tags", tag, offset=self.base + tag_start)
+        self._record_controls(quote_index, next_quote)
+        self._edit(quote_index, next_quote, "")
+        return next_quote
+
+    def _skip_blank(self, start):
+        """
+        Posición del primer carácter no blanco desde start
+        """
+        end = BLANK_RUN.match(self.content, start).end()
+        self._need(end)
+        return end
+
+    def _extra_end(self, start):
+        """
+        Fin de un "> sobrante que empieza en start, o -1 si no lo hay
+        """
+        content = self.content
+        end = self._skip_blank(start)
+        if end < len(content) and content[end] == '"':
+            end = self._skip_blank(end + 1)
+        if end < len(content) and content[end] == ">":
+            return end + 1
+        return -1
+
+    def run(self):
+        content = self.content
+        write = self.write
+        pos = self.pos
+        try:
+            while True:
+                match = TOKENS.search(content, pos)
+                if match is None:
+                    write(content[pos:])
+                    pos = len(content)
+                    return self.report
+
+                index = match.start()
+                write(content[pos:index])
+                # Si la corrección necesita más texto se retoma desde aquí
+                pos = index
+                if content[index] != '"':
+                    pos = self._fix_char(index)
+                elif index > 0 and content[index - 1] == "=":
+                    pos = self._fix_value(index)
+                else:
+                    pos = self._fix_quote(index)
+        except NeedMoreData:
+            return self.report
+        finally:
+            self.pos = pos
+
+
+class PatchRecorder:
+    """
+    Recibe las correcciones del motor en posiciones de caracteres y las
+    convierte a offsets en bytes del texto original en UTF-8
+    """
+
+    def __init__(self):
+        # Texto pendiente de contar: text[0] está en la posición char_pos
+        # del documento y text[cursor] en el byte byte_pos
+        self.text = ""
+        self.char_pos = 0
+        self.cursor = 0
+        self.byte_pos = 0
+        self.edits = []
+
+    def feed_text(self, text):
+        self.text = self.text[self.cursor :] + text
+        self.char_pos += self.cursor
+        self.cursor = 0
+
+    def _advance(self, position):
+        end = position - self.char_pos
+        self.byte_pos += len(self.text[self.cursor : end].encode("utf-8"))
+        self.cursor = end
+
+    def edit(self, start, end, replacement):
+        self._advance(start)
+        offset = self.byte_pos
+        self._advance(end)
+        length = self.byte_pos - offset
+        self.edits.append((offset, length, replacement.encode("utf-8")))
+
+    def commit(self, position):
+        """
+        Las correcciones siguientes empiezan en position o después
+        """
+        self._advance(position)
+
+
+class XMLRepairStream(io.RawIOBase):
+    """
+    Filtro de solo lectura sobre un XML binario: read() entrega el XML
+    reparado en UTF-8 a medida que se lee el original, sin copias en disco
+    ni el documento completo en memoria. El RepairReport se completa al
+    llegar al final del original.
+
+    Decodifica igual que open() en modo texto (UTF-8, saltos de línea
+    universales). recorder, si se indica, recibe cada bloque de texto con
+    feed_text(), cada corrección con edit() y con commit() la posición
+    desde la que pueden llegar las siguientes; newlines indica al final
+    qué saltos de línea tenía el original y length cuántos caracteres.
+    report permite pasar un RepairReport propio (por ejemplo con verbose).
+    """
+
+    def __init__(self, raw, chunk_size=STREAM_CHUNK_SIZE, recorder=None, report=None):
+        super().__init__()
+        self.raw = raw
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(), translate=True
+        )
+        self.chunk_size = chunk_size
+        self.recorder = recorder
+        self.pending = []
+        self.buffer = bytearray()
+        self.engine = XMLRepairEngine(
+            "",
+            self.pending.append,
+            eof=False,
+            on_edit=recorder.edit if recorder is not None else None,
+            report=report,
+        )
+        self.report = self.engine.report
+        self.length = 0
+        self.finished = False
+
+    @property
+    def newlines(self):
+        return self.decoder.newlines
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        data = self.raw.read(self.chunk_size)
+        text = self.decoder.decode(data, final=not data)
+        self.length += len(text)
+        if self.recorder is not None:
+            self.recorder.feed_text(text)
+        self.engine.feed(text, eof=not data)
+        if self.recorder is not None:
+            self.recorder.commit(self.engine.base + self.engine.pos)
+        self.finished = not data
+        if self.pending:
+            self.buffer += "".join(self.pending).encode("utf-8")
+            self.pending.clear()
+
+    def readinto(self, target):
+        while not self.buffer and not self.finished:
+            self._fill()
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        del self.buffer[:size]
+        return size
+
+
+def repair_xml_text(content, write):
+    """
+    Repara content escribiendo el resultado con write; retorna el RepairReport
+    """
+    return XMLRepairEngine(content, write).run()
+
+
+def repair_xml_string(content):
+    """
+    Retorna (contenido reparado, RepairReport)
+    """
+    output = io.StringIO()
+    report = repair_xml_text(content, output.write)
+    return output.getvalue(), report
+
+
+def repair_xml_bytes(source):
+    """
+    Repara un XML dado como bytes o como stream binario, sin pasar por disco
+    Lee y escribe UTF-8 con los mismos saltos de línea que fix_xml_specific.py
+    Retorna (bytes reparados, RepairReport)
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    text_source = io.TextIOWrapper(source, encoding="utf-8")
+    try:
+        content = text_source.read()
+    finally:
+        # No cerrar el stream del llamador
+        text_source.detach()
+
+    output = io.BytesIO()
+    text_output = io.TextIOWrapper(output, encoding="utf-8", newline="\n")
+    report = repair_xml_text(content, text_output.write)
+    text_output.flush()
+    repaired = output.getvalue()
+    text_output.detach()
+    return repaired, report
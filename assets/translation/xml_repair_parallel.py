@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Reparación de furnidata.xml en paralelo
+Divide el archivo en bloques que terminan en </furnitype>, los repara en
+un pool de procesos y los vuelve a unir en orden. Los reportes se suman y
+las ediciones de cada bloque se corrigen a offsets del archivo completo.
+
+Un bloque solo se corta donde ninguna corrección puede cruzar el corte
+(justo después de un > y sin tags de cierre antes de la próxima comilla),
+así que el resultado es el mismo que reparando el archivo entero.
+"""
+
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from xml_repair import PatchRecorder, RepairReport, XMLRepairStream
+
+RECORD_END = b"</furnitype>"
+
+# Tamaño aproximado de cada bloque
+DEFAULT_CHUNK_SIZE = 2 * 1024 * 1024
+
+
+def _is_safe_boundary(data, position):
+    """
+    True si una corrección anterior a position no puede seguir después:
+    entre position y la próxima comilla no hay ningún </
+    """
+    quote = data.find(b'"', position)
+    if quote == -1:
+        quote = len(data)
+    return data.find(b"</", position, quote) == -1
+
+
+def chunk_ranges(xml_file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Divide el archivo en rangos (inicio, fin) de bytes que terminan justo
+    después de un </furnitype> seguro; el último llega al final del archivo
+    """
+    file_size = os.path.getsize(xml_file_path)
+    if file_size == 0:
+        return []
+
+    ranges = []
+    with open(xml_file_path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        start = 0
+        while start < file_size:
+            end = file_size
+            search = start + chunk_size
+            while search < file_size:
+                found = data.find(RECORD_END, search)
+                if found == -1:
+                    break
+                boundary = found + len(RECORD_END)
+                if _is_safe_boundary(data, boundary):
+                    end = boundary
+                    break
+                search = boundary
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def repair_chunk(xml_file_path, start, end):
+    """
+    Repara un rango de bytes (se ejecuta en un worker)
+    Retorna (bytes reparados, RepairReport, ediciones relativas al
+    rango, saltos de línea encontrados, caracteres del rango)
+    """
+    with open(xml_file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    recorder = PatchRecorder()
+    stream = XMLRepairStream(io.BytesIO(data), recorder=recorder)
+    repaired = stream.read()
+    return repaired, stream.report, recorder.edits, stream.newlines, stream.length
+
+
+class ParallelRepairStream(io.RawIOBase):
+    """
+    Igual que XMLRepairStream pero reparando bloques en paralelo
+    Mantiene a lo sumo 2 bloques pendientes por worker; report, edits y
+    newlines se completan a medida que se leen los bloques
+    """
+
+    def __init__(self, xml_file_path, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__()
+        self.xml_file_path = xml_file_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.report = RepairReport()
+        # Caracteres de los bloques ya leídos, para ubicar la muestra del reporte
+        self.length = 0
+        self.edits = []
+        self.newline_kinds = set()
+        self.buffer = memoryview(b"")
+        self.chunks = self._iter_chunks()
+
+    @property
+    def newlines(self):
+        """
+        Mismo formato que IncrementalNewlineDecoder.newlines
+        """
+        if not self.newline_kinds:
+            return None
+        if len(self.newline_kinds) == 1:
+            return next(iter(self.newline_kinds))
+        return tuple(sorted(self.newline_kinds))
+
+    def _add_newlines(self, newlines):
+        if newlines is None:
+            return
+        if isinstance(newlines, str):
+            newlines = (newlines,)
+        self.newline_kinds.update(newlines)
+
+    def _iter_chunks(self):
+        ranges = chunk_ranges(self.xml_file_path, self.chunk_size)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+            next_range = 0
+            while next_range < len(ranges) or futures:
+                while next_range < len(ranges) and len(futures) < self.workers * 2:
+                    start, end = ranges[next_range]
+                    future = pool.submit(repair_chunk, self.xml_file_path, start, end)
+                    futures.append((start, future))
+                    next_range += 1
+
+                start, future = futures.pop(0)
+                repaired, report, edits, newlines, length = future.result()
+                self.report.extend(report, offset=self.length)
+                self.length += length
+                self.edits.extend(
+                    (start + offset, length, replacement)
+                    for offset, length, replacement in edits
+                )
+                self._add_newlines(newlines)
+                yield repaired
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.buffer = memoryview(chunk)
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+    def close(self):
+        # Cancela los bloques pendientes si se deja de leer antes del final
+        self.chunks.close()
+        super().close()
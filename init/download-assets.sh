@@ -99,12 +99,13 @@ if [ ! -f "/assets/assets/gamedata/FigureData.json" ] || [ ! -f "/assets/assets/
         # Instalar python3 si no está disponible
         if ! command -v python3 &> /dev/null; then
             echo "📦 Instalando Python3..."
-            apk add --no-cache python3 py3-pip
+            apk add --no-cache python3 py3-pip py3-brotli
         fi
         
         # Reparar archivos XML corruptos antes de la conversión
         echo "🔧 Reparando archivos XML corruptos..."
-        cp /assets/translation/fix_xml_specific.py /tmp/fix_xml_specific.py
+        # (fix_xml_specific.py usa xml_repair.py, así que se copian todos los módulos)
+        cp /assets/translation/*.py /tmp/
         cd /tmp
         
         # Reparar furnidata.xml si existe
@@ -113,15 +114,12 @@ if [ ! -f "/assets/assets/gamedata/FigureData.json" ] || [ ! -f "/assets/assets/
             python3 fix_xml_specific.py /assets/swf/gamedata/furnidata.xml
         fi
         
-        # Copiar script de conversión y ejecutar
-        cp /assets/translation/convert_gamedata.py /tmp/convert_gamedata.py
-        
         # Ajustar paths en el script para el entorno de contenedor
         sed -i 's|swf_base = "/usr/share/nginx/html/swf"|swf_base = "/assets/swf"|g' convert_gamedata.py
         sed -i 's|assets_base = "/usr/share/nginx/html/assets"|assets_base = "/assets/assets"|g' convert_gamedata.py
         
         # Ejecutar conversión con manejo de errores
-        if python3 convert_gamedata.py; then
+        if python3 convert_gamedata.py --parallel --precompress; then
             echo "✅ Conversión de gamedata completada!"
         else
             echo "⚠️  Conversión de gamedata completada con errores"
@@ -4,12 +4,64 @@ Script avanzado para reparar archivos XML corruptos
 Identifica y corrige múltiples problemas XML
 """
 
+import argparse
 import re
 import sys
 import os
 from xml.etree import ElementTree as ET
+from bisect import bisect_right
 from xml.parsers import expat
 
+# El diagnóstico de reparaciones vive junto a los scripts de conversión
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "translation")
+)
+
+from repair_diagnostics import RepairDiagnostics
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
+
+# Cada cuántas líneas se guarda un punto de control del parseo
+CHECKPOINT_INTERVAL = 500
+# Líneas que se entregan al parser en cada llamada
+FEED_LINES = 5000
+# Caracteres de contexto a cada lado de un error
+CONTEXT_CHARS = 20
+
+
+class IterativeRepairReport(RepairDiagnostics):
+    """
+    Correcciones de repair_xml_iteratively por categoría
+    La muestra se ubica por línea y columna (contadas desde 1), salvo los
+    caracteres de control de la limpieza inicial, que llevan su offset
+    """
+
+    categories = (
+        "control_chars",
+        "removed_chars",
+        "self_closed_tags",
+        "unfixable_errors",
+        "skipped_lines",
+        "stripped_lines",
+    )
+    labels = {
+        "control_chars": "caracteres de control removidos en la limpieza",
+        "removed_chars": "caracteres problemáticos removidos",
+        "self_closed_tags": "tags malformados corregidos",
+        "unfixable_errors": "errores sin corrección posible",
+        "skipped_lines": "líneas saltadas (caracteres inválidos)",
+        "stripped_lines": "líneas limpiadas a ASCII",
+    }
+
+
+def error_context(line, column):
+    """
+    Fragmento de line alrededor de column (contada desde 1)
+    """
+    start = max(0, column - CONTEXT_CHARS)
+    return line[start : column + CONTEXT_CHARS]
+
 
 def find_all_xml_errors(xml_file_path):
     """
@@ -37,25 +89,17 @@ def find_all_xml_errors(xml_file_path):
             print(f"❌ Error encontrado - Línea: {line_num}, Columna: {col_num}")
             print(f"📄 Mensaje: {error_msg}")
 
-            # Obtener línea específica
+            # Obtener línea específica; el contexto va en el resultado
             lines = content.split("\n")
             if line_num <= len(lines):
                 problem_line = lines[line_num - 1]
-                print(f"📍 Línea problemática: {repr(problem_line[:100])}...")
-
-                # Mostrar contexto alrededor del error
-                if col_num <= len(problem_line):
-                    start = max(0, col_num - 20)
-                    end = min(len(problem_line), col_num + 20)
-                    context = problem_line[start:end]
-                    print(f"🔍 Contexto (posición {col_num}): {repr(context)}")
-
                 errors.append(
                     {
                         "line": line_num,
                         "column": col_num,
                         "message": error_msg,
                         "content": problem_line,
+                        "context": error_context(problem_line, col_num),
                     }
                 )
 
@@ -66,17 +110,14 @@ def find_all_xml_errors(xml_file_path):
         return []
 
 
-def aggressive_xml_clean(content):
+def clean_xml_fragment(content):
     """
-    Limpieza agresiva de contenido XML
+    Pasos 1-4 de la limpieza agresiva, sin mensajes
+    Todos son locales a cada línea, así que también sirven para limpiar
+    solo las líneas que se modificaron
     """
-    print("🔧 Aplicando limpieza agresiva...")
-
-    original_len = len(content)
-
     # 1. Remover todos los caracteres de control problemáticos
-    content = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", content)
-    print(f"✅ Removidos {original_len - len(content)} caracteres de control")
+    content = CONTROL_CHARS.sub("", content)
 
     # 2. Corregir entidades XML
     entity_replacements = [
@@ -155,123 +196,271 @@ def aggressive_xml_clean(content):
 
     content = "\n".join(fixed_lines)
 
+    return content
+
+
+def aggressive_xml_clean(content, report=None):
+    """
+    Limpieza agresiva de contenido XML
+    report, si se indica, registra cada carácter de control removido
+    """
+    print("🔧 Aplicando limpieza agresiva...")
+
+    control_count = 0
+    for match in CONTROL_CHARS.finditer(content):
+        control_count += 1
+        if report is not None:
+            report.record("control_chars", match.group(0), offset=match.start())
+    content = clean_xml_fragment(content)
+    print(f"✅ Removidos {control_count} caracteres de control")
+
     # 5. Verificar estructura básica
     if not content.strip().startswith("<?xml"):
-        content = '<?xml version="1.0" encoding="UTF-8"?>\n' + content
+        content = XML_DECLARATION + "\n" + content
         print("✅ Agregada declaración XML")
 
     return content
 
 
-def repair_xml_iteratively(xml_file_path, max_iterations=10):
+def starts_with_declaration(lines):
+    """
+    Equivale a "\\n".join(lines).strip().startswith("<?xml") sin unir las líneas
+    """
+    for line in lines:
+        if line.strip():
+            return line.lstrip().startswith("<?xml")
+    return False
+
+
+class ResumableXMLCheck:
+    """
+    Verifica con expat un documento dividido en líneas y guarda puntos de
+    control (línea, pila de elementos abiertos) mientras parsea, para que
+    después de corregir una línea el parseo se reanude cerca del error en
+    vez de empezar otra vez desde el principio
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        # (índice de línea, pila) con la pila abierta al inicio de esa línea
+        self.checkpoints = [(0, ())]
+        # Con un DOCTYPE las entidades declaradas impiden reanudar a mitad
+        self.resumable = True
+
+    def reset(self):
+        """
+        Descarta los puntos de control (por ejemplo si cambió la numeración)
+        """
+        del self.checkpoints[1:]
+
+    def check(self, changed_line=0):
+        """
+        Parsea desde el último punto de control que no sea posterior a
+        changed_line (índice de la primera línea modificada)
+        Retorna None si el documento es válido o (línea, columna, mensaje)
+        del primer error, con línea y columna contadas desde 1 (expat
+        cuenta las columnas desde 0)
+        """
+        if not self.resumable:
+            changed_line = 0
+        index = bisect_right(self.checkpoints, changed_line, key=lambda cp: cp[0]) - 1
+        del self.checkpoints[index + 1 :]
+        start_line, open_tags = self.checkpoints[index]
+
+        lines = self.lines
+        # Los eventos del prefijo vuelven a abrir los elementos de la pila
+        stack = []
+        parser = expat.ParserCreate()
+        if open_tags:
+            # El prefijo reabre los elementos que estaban abiertos y ocupa
+            # una línea propia, así que las líneas siguientes conservan sus columnas
+            line_offset = start_line - 1
+        else:
+            line_offset = start_line
+
+        def record(column):
+            line_index = parser.CurrentLineNumber + line_offset - 1
+            last_line = self.checkpoints[-1][0]
+            if (
+                stack
+                and line_index - last_line >= CHECKPOINT_INTERVAL
+                and not lines[line_index][:column].strip()
+            ):
+                self.checkpoints.append((line_index, tuple(stack)))
+
+        def start_element(name, attrs):
+            record(parser.CurrentColumnNumber)
+            stack.append(name)
+
+        def end_element(name):
+            record(parser.CurrentColumnNumber)
+            stack.pop()
+
+        def start_doctype(*args):
+            self.resumable = False
+            self.reset()
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.StartDoctypeDeclHandler = start_doctype
+
+        try:
+            if open_tags:
+                parser.Parse("".join(f"<{tag}>" for tag in open_tags) + "\n", False)
+            for block_start in range(start_line, len(lines), FEED_LINES):
+                block = "\n".join(lines[block_start : block_start + FEED_LINES])
+                if block_start + FEED_LINES < len(lines):
+                    block += "\n"
+                parser.Parse(block, False)
+            parser.Parse("", True)
+        except expat.ExpatError as e:
+            line = e.lineno + line_offset
+            column = e.offset + 1
+            message = f"{expat.ErrorString(e.code)}: line {line}, column {column}"
+            return line, column, message
+        return None
+
+
+def repair_xml_iteratively(
+    xml_file_path, max_iterations=None, backup=False, report_path=None, verbose=False
+):
     """
     Repara XML iterativamente hasta que no haya errores
+
+    La limpieza agresiva se aplica una vez; después cada iteración corrige
+    solo la línea del error y reanuda el parseo desde un punto de control
+    cercano. No hay límite de iteraciones salvo que se indique
+    max_iterations: el proceso termina cuando el XML es válido o cuando un
+    error ya no se puede corregir, y en ese caso aplica la estrategia drástica
+    Con backup=True guarda una copia del original en <archivo>.backup
+    Las correcciones se cuentan por categoría y se escribe un único reporte
+    JSON en report_path (por defecto <archivo>.repair-report.json); con
+    verbose=True además se emite cada corrección por stderr
     """
     print(f"🔧 Reparando {xml_file_path} iterativamente...")
 
-    # Crear backup
-    backup_path = xml_file_path + ".backup"
     try:
         with open(xml_file_path, "r", encoding="utf-8", errors="ignore") as f:
             original_content = f.read()
-
-        with open(backup_path, "w", encoding="utf-8") as f:
-            f.write(original_content)
-        print(f"💾 Backup creado: {backup_path}")
-
     except Exception as e:
-        print(f"❌ Error creando backup: {e}")
+        print(f"❌ Error leyendo archivo: {e}")
         return False
 
-    content = original_content
-
-    for iteration in range(max_iterations):
-        print(f"\n🔄 Iteración {iteration + 1}/{max_iterations}")
-
-        # Aplicar limpieza agresiva
-        content = aggressive_xml_clean(content)
-
-        # Probar parseo
+    # Crear backup (opcional)
+    if backup:
+        backup_path = xml_file_path + ".backup"
         try:
-            ET.fromstring(content)
-            print("✅ XML válido!")
+            with open(backup_path, "w", encoding="utf-8") as f:
+                f.write(original_content)
+            print(f"💾 Backup creado: {backup_path}")
+
+        except Exception as e:
+            print(f"❌ Error creando backup: {e}")
+            return False
+
+    report = IterativeRepairReport(verbose=sys.stderr if verbose else None)
+
+    # Aplicar limpieza agresiva
+    lines = aggressive_xml_clean(original_content, report).split("\n")
+    checker = ResumableXMLCheck(lines)
+    changed_line = 0
+    iteration = 0
+    valid = False
+
+    while max_iterations is None or iteration < max_iterations:
+        iteration += 1
+
+        # Probar parseo desde el punto de control más cercano
+        error = checker.check(changed_line)
+        if error is None:
+            print(f"✅ XML válido después de {iteration} iteraciones")
+            valid = True
+            break
+
+        error_line, error_col, message = error
+
+        fixed = False
+        if error_line and error_col is not None:
+            # Intentar corrección específica
+            if error_line <= len(lines):
+                problem_line = lines[error_line - 1]
+                fixed_line = problem_line
+                context = error_context(problem_line, error_col)
+
+                # Correcciones específicas basadas en el error
+                if "not well-formed" in message:
+                    # Remover caracter problemático
+                    col = error_col - 1
+                    if col < len(problem_line):
+                        fixed_line = problem_line[:col] + problem_line[col + 1 :]
+                        report.record(
+                            "removed_chars", context, line=error_line, column=error_col
+                        )
+
+                elif "mismatched tag" in message:
+                    # Intentar corregir tag malformado
+                    fixed_line = re.sub(r"<([^/>]+)(?<!/)>", r"<\1/>", problem_line)
+                    if fixed_line != problem_line:
+                        report.record(
+                            "self_closed_tags", context, line=error_line, column=error_col
+                        )
+
+                if fixed_line != problem_line:
+                    # Solo la línea corregida necesita volver a limpiarse
+                    lines[error_line - 1] = clean_xml_fragment(fixed_line + "\n")[:-1]
+                    changed_line = error_line - 1
+                    fixed = True
+
+                    if not starts_with_declaration(lines):
+                        # Agregar la línea cambia la numeración de todo el documento
+                        lines.insert(0, XML_DECLARATION)
+                        checker.reset()
+                        changed_line = 0
+                        print("✅ Agregada declaración XML")
+
+        if not fixed:
+            # Sin corrección posible, repetir el parseo daría el mismo error
+            print(f"❌ Error XML sin corrección posible: {message}")
+            report.record("unfixable_errors", message, line=error_line, column=error_col)
             break
-        except ET.ParseError as e:
-            print(f"❌ Error XML: {e}")
-
-            # Extraer información del error
-            error_line = getattr(e, "lineno", None)
-            error_col = getattr(e, "offset", None)
-
-            if error_line and error_col:
-                print(f"📍 Error en línea {error_line}, columna {error_col}")
-
-                # Intentar corrección específica
-                lines = content.split("\n")
-                if error_line <= len(lines):
-                    problem_line = lines[error_line - 1]
-                    print(f"📄 Línea problemática: {repr(problem_line[:100])}")
-
-                    # Correcciones específicas basadas en el error
-                    if "not well-formed" in str(e):
-                        # Remover caracter problemático
-                        if error_col <= len(problem_line):
-                            char_before = problem_line[: error_col - 1]
-                            char_after = problem_line[error_col:]
-                            fixed_line = char_before + char_after
-                            lines = (
-                                lines[: error_line - 1]
-                                + [fixed_line]
-                                + lines[error_line:]
-                            )
-                            print(
-                                f"✅ Caracter problemático removido en posición {error_col}"
-                            )
-
-                    elif "mismatched tag" in str(e):
-                        # Intentar corregir tag malformado
-                        fixed_line = re.sub(r"<([^/>]+)(?<!/)>", r"<\1/>", problem_line)
-                        if fixed_line != problem_line:
-                            lines = (
-                                lines[: error_line - 1]
-                                + [fixed_line]
-                                + lines[error_line:]
-                            )
-                            print("✅ Tag malformado corregido")
-
-                    content = "\n".join(lines)
-
-            # Si es la última iteración, intentar estrategia más drástica
-            if iteration == max_iterations - 1:
-                print("🔧 Aplicando estrategia drástica: remover líneas problemáticas")
-                lines = content.split("\n")
-                cleaned_lines = []
-
-                for i, line in enumerate(lines, 1):
-                    # Verificar si la línea tiene problemas obvios
-                    if any(ord(c) < 32 and c not in ["\t", "\n", "\r"] for c in line):
-                        print(f"⚠️  Saltando línea {i} (caracteres inválidos)")
-                        continue
-
-                    # Verificar si es una línea XML válida básica
-                    if line.strip() and not line.strip().startswith("<?xml"):
-                        try:
-                            # Intentar crear un fragmento XML válido
-                            test_xml = f"<root>{line}</root>"
-                            ET.fromstring(test_xml)
-                        except:
-                            # Si falla, limpiar la línea más agresivamente
-                            line = re.sub(r"[^\x09\x0A\x0D\x20-\x7E]", "", line)
-
-                    cleaned_lines.append(line)
-
-                content = "\n".join(cleaned_lines)
-
-    # Escribir archivo reparado
+
+    if not valid:
+        # Si no se pudo reparar, intentar estrategia más drástica
+        print("🔧 Aplicando estrategia drástica: remover líneas problemáticas")
+        cleaned_lines = []
+
+        for i, line in enumerate(lines, 1):
+            # Verificar si la línea tiene problemas obvios
+            if any(ord(c) < 32 and c not in ["\t", "\n", "\r"] for c in line):
+                report.record("skipped_lines", line, line=i)
+                continue
+
+            # Verificar si es una línea XML válida básica
+            if line.strip() and not line.strip().startswith("<?xml"):
+                try:
+                    # Intentar crear un fragmento XML válido
+                    test_xml = f"<root>{line}</root>"
+                    ET.fromstring(test_xml)
+                except:
+                    # Si falla, limpiar la línea más agresivamente
+                    report.record("stripped_lines", line, line=i)
+                    line = re.sub(r"[^\x09\x0A\x0D\x20-\x7E]", "", line)
+
+            cleaned_lines.append(line)
+
+        lines = cleaned_lines
+
+    report.print_summary()
+
+    # Escribir archivo reparado y el reporte de correcciones
+    if report_path is None:
+        report_path = xml_file_path + ".repair-report.json"
     try:
         with open(xml_file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+            f.write("\n".join(lines))
         print(f"✅ Archivo reparado: {xml_file_path}")
+        report.write_json(report_path)
+        print(f"📄 Reporte de correcciones: {report_path}")
         return True
     except Exception as e:
         print(f"❌ Error escribiendo archivo: {e}")
@@ -279,11 +468,31 @@ def repair_xml_iteratively(xml_file_path, max_iterations=10):
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python3 repair_xml_advanced.py <ruta_al_archivo.xml>")
-        sys.exit(1)
-
-    xml_file_path = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="Repara archivos XML corruptos de forma iterativa."
+    )
+    parser.add_argument("xml_file_path", metavar="ruta_al_archivo.xml")
+    parser.add_argument(
+        "--backup",
+        action="store_true",
+        help="Guardar una copia del original en <archivo>.backup.",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="REPORTE.json",
+        help=(
+            "Ruta del reporte JSON de correcciones "
+            "(default: <archivo>.repair-report.json)."
+        ),
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Emitir cada corrección por stderr.",
+    )
+    args = parser.parse_args()
+
+    xml_file_path = args.xml_file_path
 
     if not os.path.exists(xml_file_path):
         print(f"❌ Archivo no encontrado: {xml_file_path}")
@@ -299,7 +508,12 @@ def main():
         sys.exit(0)
 
     # Reparar iterativamente
-    if repair_xml_iteratively(xml_file_path):
+    if repair_xml_iteratively(
+        xml_file_path,
+        backup=args.backup,
+        report_path=args.report,
+        verbose=args.verbose,
+    ):
         print("🎉 ¡Reparación completada exitosamente!")
         sys.exit(0)
     else:
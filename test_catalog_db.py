@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la sincronización de catalog_items.catalog_name
+Se ejecutan contra SQLiteCatalog, el doble local de la base del emulador
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "translation"))
+
+import catalog_db  # noqa: E402
+from SQLGenerator import update_parameters  # noqa: E402
+
+KNOWN_NAMES = [
+    {"classname": f"furni_{number}", "name": f"Furni {number}"} for number in range(1, 1001)
+] + [
+    {"classname": "chair_ñ", "name": "Silla"},
+    {"classname": "chair_€", "name": "Silla"},
+    {"classname": "no_name", "name": None},
+]
+
+
+class FlakySQLiteCatalog(catalog_db.SQLiteCatalog):
+    """
+    SQLiteCatalog cuyos primeros lotes fallan con un error transitorio
+    """
+
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+        self.reconnects = 0
+
+    def reconnect(self):
+        self.reconnects += 1
+
+    def update_batch(self, batch):
+        super().update_batch(batch)
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+
+
+def seeded_catalog(catalog, copies=2):
+    """
+    items_base con cada classname más uno sin traducción
+    """
+    catalog.seed([furni["classname"] for furni in KNOWN_NAMES] + ["unknown"], copies)
+    return catalog
+
+
+def expected_names():
+    """
+    Lo que dejan las sentencias UPDATE por fila de SQLGenerator: cada
+    item_name con nombre recibe su classname, salvo los que pierden
+    caracteres al pasar a latin-1 y ya no coinciden
+    """
+    names = {furni["classname"]: furni["name"] for furni in KNOWN_NAMES}
+    expected = {}
+    for item_id, classname in enumerate(list(names) + ["unknown"], 1):
+        latin1 = classname.encode("latin-1", "ignore").decode("latin-1")
+        translated = names.get(classname) is not None and latin1 == classname
+        expected[str(item_id)] = classname if translated else ""
+    return expected
+
+
+def test_sync_matches_per_row_updates():
+    """
+    Todos los lotes: mismo resultado que una sentencia por fila
+    """
+    for batch_size in (1, 7, 500, 5000):
+        with seeded_catalog(catalog_db.SQLiteCatalog(":memory:")) as catalog:
+            sent = catalog_db.sync_catalog_names(
+                catalog, update_parameters(KNOWN_NAMES), batch_size, progress=False
+            )
+            assert sent == len(KNOWN_NAMES) - 1
+            assert catalog.catalog_names() == expected_names(), batch_size
+            assert catalog.connection.execute(
+                "SELECT COUNT(*) FROM catalog_items"
+            ).fetchone()[0] == 2 * (len(KNOWN_NAMES) + 1)
+
+
+def test_failed_batch_is_retried():
+    """
+    Un lote que falla se deshace y se reintenta tras reconectar
+    """
+    delays = []
+    with seeded_catalog(FlakySQLiteCatalog(":memory:", failures=2)) as catalog:
+        catalog_db.sync_catalog_names(
+            catalog, update_parameters(KNOWN_NAMES), 100, retries=2,
+            progress=False, sleep=delays.append,
+        )
+        assert catalog.catalog_names() == expected_names()
+        assert catalog.reconnects == 2
+        assert delays == [catalog_db.RETRY_DELAY, catalog_db.RETRY_DELAY * 2]
+
+
+def test_retries_exhausted():
+    """
+    Sin reintentos disponibles el error se propaga y el lote no queda aplicado
+    """
+    with seeded_catalog(FlakySQLiteCatalog(":memory:", failures=1)) as catalog:
+        try:
+            catalog_db.sync_catalog_names(
+                catalog, update_parameters(KNOWN_NAMES), 100, retries=0,
+                progress=False, sleep=lambda delay: None,
+            )
+        except sqlite3.OperationalError:
+            pass
+        else:
+            assert False, "se esperaba OperationalError"
+        assert set(catalog.catalog_names().values()) == {""}
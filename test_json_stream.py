@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Pruebas del escritor JSON incremental de gamedata
+La salida de StreamingJSONWriter se compara con la de json.dump
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "translation"))
+
+from json_stream import (  # noqa: E402
+    FURNITUREDATA_LAYOUT,
+    PRODUCTDATA_LAYOUT,
+    SEPARATORS,
+    StreamingJSONWriter,
+)
+
+ROOM_ITEMS = [
+    {"id": 1, "classname": "chair", "name": "Silla \"roja\"", "xdim": 1, "ydim": 1},
+    {"id": 2, "classname": "table*3", "name": "Mesa ñandú €", "partcolors": {"color": ["#ffffff"]}},
+]
+WALL_ITEMS = [{"id": 3, "classname": "poster", "name": "Póster\n\t\\", "revision": None}]
+PRODUCTS = [{"code": "chair", "name": "Silla", "description": ""}]
+
+
+def write_document(layout, arrays, suspend_every=0):
+    """
+    Escribe arrays con StreamingJSONWriter y retorna el texto generado
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        json_file_path = os.path.join(directory, "out.json")
+        with StreamingJSONWriter(json_file_path, layout) as writer:
+            for index, records in enumerate(arrays):
+                if index:
+                    writer.next_array()
+                for count, record in enumerate(records, 1):
+                    writer.write(record)
+                    if suspend_every and count % suspend_every == 0:
+                        writer.suspend()
+        with open(json_file_path, encoding="utf-8") as f:
+            return f.read()
+
+
+def test_furnidata_matches_json_dump():
+    """
+    FurnitureData con sus dos arrays, igual que json.dump
+    """
+    expected = json.dumps(
+        {
+            "roomitemtypes": {"furnitype": ROOM_ITEMS},
+            "wallitemtypes": {"furnitype": WALL_ITEMS},
+        },
+        separators=SEPARATORS,
+    )
+    assert write_document(FURNITUREDATA_LAYOUT, [ROOM_ITEMS, WALL_ITEMS]) == expected
+
+
+def test_productdata_matches_json_dump():
+    """
+    ProductData con un solo array
+    """
+    expected = json.dumps({"productdata": {"product": PRODUCTS}}, separators=SEPARATORS)
+    assert write_document(PRODUCTDATA_LAYOUT, [PRODUCTS]) == expected
+
+
+def test_empty_arrays():
+    """
+    Los arrays del layout que no reciben registros quedan vacíos
+    """
+    expected = json.dumps(
+        {"roomitemtypes": {"furnitype": []}, "wallitemtypes": {"furnitype": []}},
+        separators=SEPARATORS,
+    )
+    assert write_document(FURNITUREDATA_LAYOUT, []) == expected
+
+
+def test_suspend_keeps_output():
+    """
+    Suspender y reabrir el archivo temporal no cambia la salida
+    """
+    arrays = [ROOM_ITEMS * 3, WALL_ITEMS * 2]
+    assert write_document(FURNITUREDATA_LAYOUT, arrays, suspend_every=1) == write_document(
+        FURNITUREDATA_LAYOUT, arrays
+    )
+
+
+def test_error_keeps_destination():
+    """
+    Si el bloque falla, el destino no se toca y no queda el temporal
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        json_file_path = os.path.join(directory, "out.json")
+        with open(json_file_path, "w", encoding="utf-8") as f:
+            f.write("{}")
+        try:
+            with StreamingJSONWriter(json_file_path, PRODUCTDATA_LAYOUT) as writer:
+                writer.write(PRODUCTS[0])
+                raise RuntimeError("falla simulada")
+        except RuntimeError:
+            pass
+        with open(json_file_path, encoding="utf-8") as f:
+            assert f.read() == "{}"
+        assert os.listdir(directory) == ["out.json"]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la reparación iterativa de repair_xml_advanced
+"""
+
+import json
+import os
+import tempfile
+
+from repair_xml_advanced import ResumableXMLCheck, repair_xml_iteratively
+
+
+def repair(content):
+    """
+    Repara content en un archivo temporal; retorna (resultado, reporte)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        xml_file_path = os.path.join(directory, "furnidata.xml")
+        with open(xml_file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        assert repair_xml_iteratively(xml_file_path)
+        with open(xml_file_path, encoding="utf-8") as f:
+            repaired = f.read()
+        with open(xml_file_path + ".repair-report.json", encoding="utf-8") as f:
+            return repaired, json.load(f)
+
+
+def test_check_reports_columns_from_one():
+    """
+    La columna del error se cuenta desde 1, en el resultado y en el mensaje
+    """
+    line, column, message = ResumableXMLCheck(['<a>', '<b k="1" "2">t</b>', '</a>']).check()
+    assert (line, column) == (2, 10)
+    assert '<b k="1" "2">t</b>'[column - 1] == '"'
+    assert message.endswith("line 2, column 10")
+
+
+def test_removes_the_offending_character():
+    """
+    Se elimina el carácter del error, no el anterior
+    """
+    repaired, report = repair('<a>\n<b k="1" "2">t</b>\n</a>\n')
+    assert '<b k="1" >t</b>' in repaired.split("\n")
+    # La declaración agregada corre una línea la numeración
+    sample = report["samples"]["removed_chars"][0]
+    assert (sample["line"], sample["column"]) == (3, 10)
+
+
+def test_removes_character_at_first_column():
+    """
+    Un error en la primera columna también se corrige
+    """
+    repaired, report = repair("<a>\n\ufffe\n</a>\n")
+    assert repaired.split("\n")[1:4] == ["<a>", "", "</a>"]
+    assert report["samples"]["removed_chars"][0]["column"] == 1
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Pruebas de FurnitureDataTranslator
+Las salidas se comparan con las de la versión original del traductor,
+copiada aquí como referencia
+"""
+
+import contextlib
+import copy
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+TRANSLATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "translation")
+sys.path.insert(0, TRANSLATION_DIR)
+
+import FurnitureDataTranslator as translator  # noqa: E402
+from build_manifest import BuildManifest  # noqa: E402
+
+todo_types = ["roomitemtypes", "wallitemtypes"]
+
+
+def normalize_classnames(classname):
+    return str(classname).replace("_", "").replace(" ", "")
+
+
+def baseline_translation(localized_furni, localized_products, furniture_data, product_data):
+    """
+    El traductor original: retorna (FurnitureData, ProductData) traducidos
+    """
+    furniture_dict = {}
+    for todo_type in todo_types:
+        for furnitype in localized_furni[todo_type]["furnitype"]:
+            classname = normalize_classnames(furnitype['classname'])
+            furniture_dict[classname] = {
+                "name": furnitype['name'],
+                "description": furnitype['description'],
+                "specialtype": furnitype['specialtype'],
+            }
+            if str(furniture_dict[classname]['description']).endswith("desc"):
+                furniture_dict[classname]['description'] = ""
+
+    for product in localized_products["productdata"]["product"]:
+        classname = normalize_classnames(product['code'])
+        furniture_dict[classname] = {
+            "name": product['name'],
+            "description": product['description'],
+        }
+        if str(furniture_dict[classname]['description']).endswith("desc"):
+            furniture_dict[classname]['description'] = ""
+
+    furniture_data = copy.deepcopy(furniture_data)
+    for todo_type in todo_types:
+        for furnitype in furniture_data[todo_type]["furnitype"]:
+            classname = normalize_classnames(furnitype['classname'])
+            if classname in furniture_dict:
+                furnitype['name'] = furniture_dict[classname]['name']
+                furnitype['description'] = furniture_dict[classname]['description']
+                if "specialtype" in furniture_dict[classname]:
+                    furnitype['specialtype'] = furniture_dict[classname]['specialtype']
+
+    product_data = copy.deepcopy(product_data)
+    for product in product_data["productdata"]["product"]:
+        classname = normalize_classnames(product['code'])
+        if classname in furniture_dict:
+            product['name'] = furniture_dict[classname]['name']
+            product['description'] = furniture_dict[classname]['description']
+
+    return furniture_data, product_data
+
+
+def furni(classname, name, description="", specialtype=1, **extra):
+    return dict(id=len(classname), classname=classname, name=name,
+                description=description, specialtype=specialtype, **extra)
+
+
+def base_gamedata():
+    """
+    FurnitureData.json y ProductData.json base
+    """
+    furniture_data = {
+        "roomitemtypes": {"furnitype": [
+            furni("chair_red", "chair_red name", "chair_red desc", revision=3),
+            furni("table*3", "table name"),
+            furni("sofa big", "sofa", "sofa desc", 2),
+            furni("lamp", "lamp"),
+            furni("untranslated", "untranslated name"),
+        ]},
+        "wallitemtypes": {"furnitype": [
+            furni("poster 12", "poster"),
+            furni("window_a", "window"),
+        ]},
+    }
+    product_data = {"productdata": {"product": [
+        {"code": "chair_red", "name": "chair", "description": ""},
+        {"code": "lamp", "name": "lamp", "description": "lamp desc"},
+        {"code": "other", "name": "other", "description": "other"},
+    ]}}
+    return furniture_data, product_data
+
+
+def localized_gamedata(suffix):
+    """
+    furnidata.json y productdata.json localizados, con nombres que
+    terminan en suffix
+    """
+    localized_furni = {
+        "roomitemtypes": {"furnitype": [
+            furni("chairred", "Silla" + suffix, "Silla roja" + suffix, 4),
+            furni("table*3", "Mesa ñandú €" + suffix, "table*3 desc"),
+            furni("sofa_big", "Sofá" + suffix, "Sofá grande" + suffix, 2),
+            furni("lamp", "Lámpara" + suffix, "Lámpara", 9),
+            # Duplicado: vale el último
+            furni("lamp", "Lámpara 2" + suffix, "Lámpara 2", 7),
+        ]},
+        "wallitemtypes": {"furnitype": [
+            furni("poster_12", "Póster\n\"12\"" + suffix, "Póster", None),
+        ]},
+    }
+    localized_products = {"productdata": {"product": [
+        # Los productos pisan a los furnis y no tienen specialtype
+        {"code": "lamp", "name": "Lámpara producto" + suffix, "description": "lamp desc"},
+        {"code": "other", "name": "Otro" + suffix, "description": "Otro"},
+    ]}}
+    return localized_furni, localized_products
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+def read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@contextlib.contextmanager
+def translation_tree():
+    """
+    Directorio temporal con la estructura que espera el traductor
+    (translation/gamedata y assets/gamedata), como directorio actual
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        translation_dir = os.path.join(directory, "translation")
+        os.makedirs(translation_dir)
+        furniture_data, product_data = base_gamedata()
+        write_json(os.path.join(directory, "assets", "gamedata", "FurnitureData.json"), furniture_data)
+        write_json(os.path.join(directory, "assets", "gamedata", "ProductData.json"), product_data)
+        os.chdir(translation_dir)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
+
+
+def expected_files(suffix):
+    """
+    Contenido que escribe el traductor original para localized_gamedata(suffix)
+    """
+    furniture_data, product_data = baseline_translation(*localized_gamedata(suffix), *base_gamedata())
+    return (
+        json.dumps(furniture_data, separators=(",", ":")),
+        json.dumps(product_data, separators=(",", ":")),
+    )
+
+
+def test_translate_matches_baseline():
+    """
+    Modo de un idioma: mismos archivos que el traductor original
+    """
+    with translation_tree():
+        localized_furni, localized_products = localized_gamedata("")
+        write_json(translator.LOCALIZED_FURNIDATA, localized_furni)
+        write_json(translator.LOCALIZED_PRODUCTDATA, localized_products)
+
+        summary = translator.translate()
+        assert summary["FurnitureData.json"]["rewritten"]
+        assert summary["ProductData.json"]["rewritten"]
+        assert (read_text(translator.FURNITUREDATA), read_text(translator.PRODUCTDATA)) == expected_files("")
+
+
+def test_translate_is_incremental():
+    """
+    Sin cambios no se reescribe nada; al cambiar solo los productos, solo
+    cambia ProductData.json y su .gz se regenera
+    """
+    with translation_tree():
+        localized_furni, localized_products = localized_gamedata("")
+        write_json(translator.LOCALIZED_FURNIDATA, localized_furni)
+        write_json(translator.LOCALIZED_PRODUCTDATA, localized_products)
+        translator.translate()
+        assert translator.translate() is None
+
+        with open(translator.PRODUCTDATA + ".gz", "wb") as f:
+            f.write(gzip.compress(b"{}"))
+        furnituredata_mtime = os.stat(translator.FURNITUREDATA).st_mtime_ns
+        localized_products["productdata"]["product"][1]["name"] = "Otro nuevo"
+        write_json(translator.LOCALIZED_PRODUCTDATA, localized_products)
+
+        summary = translator.translate()
+        assert not summary["FurnitureData.json"]["rewritten"]
+        assert summary["ProductData.json"]["changed"] == 1
+        assert os.stat(translator.FURNITUREDATA).st_mtime_ns == furnituredata_mtime
+        expected = json.loads(expected_files("")[1])
+        expected["productdata"]["product"][2]["name"] = "Otro nuevo"
+        assert json.loads(read_text(translator.PRODUCTDATA)) == expected
+        with gzip.open(translator.PRODUCTDATA + ".gz", "rt", encoding="utf-8") as f:
+            assert f.read() == read_text(translator.PRODUCTDATA)
+
+
+def test_translate_keeps_conversion_cache():
+    """
+    La conversión registró FurnitureData.json sin traducir (con ruta
+    absoluta); después de traducirlo en su lugar su caché sigue válida
+    """
+    with translation_tree() as directory:
+        source = os.path.join(directory, "furnidata.xml")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("<furnidata/>")
+        output = os.path.abspath(translator.FURNITUREDATA)
+        manifest = BuildManifest(translator.GAMEDATA_DIR)
+        manifest.record(output, [source], "1", [output])
+        manifest.save()
+
+        localized_furni, localized_products = localized_gamedata("")
+        write_json(translator.LOCALIZED_FURNIDATA, localized_furni)
+        write_json(translator.LOCALIZED_PRODUCTDATA, localized_products)
+        assert translator.translate()["FurnitureData.json"]["rewritten"]
+        assert BuildManifest(translator.GAMEDATA_DIR).is_fresh(output, [source], "1")
+
+
+def test_translate_locales_matches_baseline():
+    """
+    Modo de varios idiomas: cada salida es la del traductor original y los
+    archivos base no se modifican
+    """
+    with translation_tree() as directory:
+        base_files = (read_text(translator.FURNITUREDATA), read_text(translator.PRODUCTDATA))
+        locales = {}
+        for name in ("es", "pt"):
+            locale_dir = os.path.join(directory, "locales-src", name)
+            localized_furni, localized_products = localized_gamedata(f" ({name})")
+            write_json(os.path.join(locale_dir, "furnidata.json"), localized_furni)
+            write_json(os.path.join(locale_dir, "productdata.json"), localized_products)
+            locales[name] = locale_dir
+
+        summaries = translator.translate_locales(locales, workers=1)
+        assert sorted(summaries) == ["es", "pt"]
+        for name in locales:
+            output_dir = os.path.join(translator.LOCALES_DIR, name)
+            written = (
+                read_text(os.path.join(output_dir, "FurnitureData.json")),
+                read_text(os.path.join(output_dir, "ProductData.json")),
+            )
+            assert written == expected_files(f" ({name})"), name
+        assert (read_text(translator.FURNITUREDATA), read_text(translator.PRODUCTDATA)) == base_files
+        assert translator.translate_locales(locales, workers=1) == {}
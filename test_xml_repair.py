@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Pruebas del motor de reparación de furnidata.xml
+La salida se compara con las pasadas de regex originales de
+fix_specific_xml_errors, copiadas aquí como referencia
+"""
+
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "translation"))
+
+from xml_patch import PATCH_DIR_NAME, CachedRepairStream, RepairPatchCache  # noqa: E402
+from xml_repair import PatchRecorder, XMLRepairStream, repair_xml_string  # noqa: E402
+from xml_repair_parallel import ParallelRepairStream, chunk_ranges  # noqa: E402
+
+# Piezas de los documentos aleatorios: comillas, tags de cierre,
+# customparams, entidades y caracteres de control
+PIECES = [
+    "<", "</", ">", '"', '="', "=", "a", "x", " ", "\n", "&", "&amp;", "\x01",
+    '</a">', '</x="a=</a">', "<customparams>", "</customparams>", '">',
+]
+CASES = 3000
+
+ENTITIES = (
+    ("&amp;", "___TEMP_AMP___"),
+    ("&lt;", "___TEMP_LT___"),
+    ("&gt;", "___TEMP_GT___"),
+    ("&quot;", "___TEMP_QUOT___"),
+    ("&apos;", "___TEMP_APOS___"),
+)
+
+
+def regex_passes(content):
+    """
+    Las pasadas de fix_specific_xml_errors, en el mismo orden
+    """
+    def fix_customparams(match):
+        inner_content = match.group(1)
+        if inner_content.count('"') % 2 == 1:
+            return f'<customparams>{inner_content}"</customparams>'
+        return match.group(0)
+
+    content = re.sub(r'<customparams>([^<]*="[^"]*)</customparams>', fix_customparams, content)
+    content = re.sub(r'="([^"]*)</([^>]+)>', lambda m: f'="{m.group(1)}"></{m.group(2)}>', content)
+    content = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", content)
+    for entity, placeholder in ENTITIES:
+        content = content.replace(entity, placeholder)
+    content = content.replace("&", "&amp;")
+    for entity, placeholder in ENTITIES:
+        content = content.replace(placeholder, entity)
+    content = re.sub(r'</([^>]+)"\s*>\s*"?\s*>', lambda m: f"</{m.group(1)}>", content)
+    content = re.sub(r'</customparams"\s*>\s*"?\s*>', "</customparams>", content)
+    content = re.sub(r'</([^>]+)"\s*>', lambda m: f"</{m.group(1)}>", content)
+    return content
+
+
+def random_documents(count, max_pieces=30):
+    for seed in range(count):
+        rng = random.Random(seed)
+        yield "".join(rng.choice(PIECES) for _ in range(rng.randint(1, max_pieces)))
+
+
+def test_known_defects():
+    """
+    Los defectos que corrige cada pasada
+    """
+    cases = {
+        '<customparams>a="b</customparams>': '<customparams>a="b"</customparams>',
+        '<name="b</name>': '<name="b"></name>',
+        "<name>a\x01b</name>": "<name>ab</name>",
+        "<name>a & b &amp; c</name>": "<name>a &amp; b &amp; c</name>",
+        '<name>a</name">">': "<name>a</name>",
+        '<name>a</name">': "<name>a</name>",
+        '<a x="1</x="a=</a">': '<a x="1"></x="a=</a>',
+    }
+    for content, expected in cases.items():
+        assert repair_xml_string(content)[0] == expected == regex_passes(content), content
+
+
+def test_matches_regex_passes():
+    """
+    Documentos aleatorios: misma salida que las pasadas de regex
+    """
+    for content in random_documents(CASES):
+        assert repair_xml_string(content)[0] == regex_passes(content), repr(content)
+
+
+def test_stream_matches_string():
+    """
+    XMLRepairStream con ventanas chicas da la misma salida y el mismo reporte
+    """
+    for index, content in enumerate(random_documents(CASES // 10, 60)):
+        expected, report = repair_xml_string(content)
+        stream = XMLRepairStream(io.BytesIO(content.encode()), chunk_size=1 + index % 7)
+        assert stream.read().decode() == expected, repr(content)
+        assert stream.report.to_dict() == report.to_dict(), repr(content)
+
+
+def read_cached(xml_file_path, digest, cache, read_size):
+    """
+    Lee todo CachedRepairStream de a read_size bytes
+    """
+    stream = CachedRepairStream(xml_file_path, digest, cache)
+    chunks = []
+    while True:
+        chunk = stream.read(read_size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    stream.close()
+    return stream, b"".join(chunks)
+
+
+def test_patch_round_trip():
+    """
+    La segunda lectura aplica el parche guardado: misma salida y reporte
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        xml_file_path = os.path.join(directory, "furnidata.xml")
+        cache = RepairPatchCache(directory)
+        for index, content in enumerate(random_documents(CASES // 10, 60)):
+            data = (content + "é€\n").encode()
+            with open(xml_file_path, "wb") as f:
+                f.write(data)
+            expected, report = repair_xml_string(data.decode())
+            digest = str(index)
+            for from_patch in (False, True):
+                stream, repaired = read_cached(xml_file_path, digest, cache, 1 + index % 5)
+                assert stream.from_patch == from_patch, repr(content)
+                assert repaired == expected.encode(), repr(content)
+                assert stream.report.to_dict() == report.to_dict(), repr(content)
+
+
+def test_crlf_is_not_patched():
+    """
+    Con saltos \r\n los offsets no valen: no se guarda parche
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        xml_file_path = os.path.join(directory, "furnidata.xml")
+        with open(xml_file_path, "wb") as f:
+            f.write(b'<a x="1</a>\r\n<b>&</b>\r\n')
+        cache = RepairPatchCache(directory)
+        stream, repaired = read_cached(xml_file_path, "crlf", cache, 4096)
+        assert repaired == repair_xml_string('<a x="1</a>\n<b>&</b>\n')[0].encode()
+        assert not stream.from_patch
+        assert cache.load("crlf") is None
+        assert not os.path.exists(os.path.join(directory, PATCH_DIR_NAME))
+
+
+def test_parallel_matches_serial():
+    """
+    ParallelRepairStream con bloques chicos: misma salida, reporte y
+    ediciones que la reparación en un solo proceso
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        xml_file_path = os.path.join(directory, "furnidata.xml")
+        for seed in range(5):
+            records = random_documents(200 * (seed + 1), 20)
+            content = "<furnidata>\n" + "</furnitype>\n".join(records) + "</furnidata>\n"
+            data = content.encode()
+            with open(xml_file_path, "wb") as f:
+                f.write(data)
+
+            recorder = PatchRecorder()
+            serial = XMLRepairStream(io.BytesIO(data), recorder=recorder)
+            expected = serial.read()
+
+            assert len(chunk_ranges(xml_file_path, 64)) > 1
+            stream = ParallelRepairStream(xml_file_path, 2, 64)
+            repaired = stream.read()
+            stream.close()
+            assert repaired == expected
+            assert stream.report.to_dict() == serial.report.to_dict()
+            assert stream.edits == recorder.edits